@@ -19,23 +19,29 @@ import logging
 
 """ <<<Game Begin>>> """
 
-# This game object contains the initial game state.
-game = hlt.Game()
-# At this point "game" variable is populated with initial map data.
-# This is a good place to do computationally expensive start-up pre-processing.
-# As soon as you call "ready" function below, the 2 second per turn timer will start.
-game.ready("MyPythonBot")
+def setup(game):
+    """
+    Runs once on the initial game state, before the first turn, and reports the bot ready.
+    :param game: The game object, populated with the initial map data
+    :return: nothing.
+    """
+    # This is a good place to do computationally expensive start-up pre-processing.
+    # As soon as you call "ready" function below, the 2 second per turn timer will start.
+    game.ready("MyPythonBot")
+
+    # Now that your bot is initialized, save a message to yourself in the log file with some important information.
+    #   Here, you log here your id, which you can always fetch from the game object by using my_id.
+    logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
 
-# Now that your bot is initialized, save a message to yourself in the log file with some important information.
-#   Here, you log here your id, which you can always fetch from the game object by using my_id.
-logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
 
 """ <<<Game Loop>>> """
 
-while True:
-    # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
-    #   running update_frame().
-    game.update_frame()
+def turn(game):
+    """
+    Plays one turn.
+    :param game: The game object, refreshed for this turn by update_frame
+    :return: The commands to send for this turn
+    """
     # You extract player metadata and the updated map metadata here for convenience.
     me = game.me
     game_map = game.game_map
@@ -59,6 +65,17 @@ while True:
     if game.turn_number <= 200 and me.halite_amount >= constants.SHIP_COST and not game_map[me.shipyard].is_occupied:
         command_queue.append(me.shipyard.spawn())
 
-    # Send your moves back to the game environment, ending this turn.
-    game.end_turn(command_queue)
+    return command_queue
+
+
+if __name__ == "__main__":
+    # This game object contains the initial game state.
+    game = hlt.Game()
+    setup(game)
 
+    while True:
+        # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
+        #   running update_frame().
+        game.update_frame()
+        # Send your moves back to the game environment, ending this turn.
+        game.end_turn(turn(game))
@@ -3,7 +3,9 @@
 
 import hlt
 from hlt import constants
-from hlt.positionals import Direction, Position
+from hlt.positionals import Position
+from hlt.fleet import MoveResolver
+from hlt.recall import RecallScheduler
 import random
 from math import inf, pow
 # Logging allows you to save messages for yourself. This is required because the regular STDOUT
@@ -11,18 +13,15 @@ from math import inf, pow
 import logging
 
 """ <<<Game Begin>>> """
-# This game object contains the initial game state.
-game = hlt.Game()
 
-
-# total number of turns based on the grid size (linear relationship)
-def get_total_turn_count(input_game):
-    return 3.125 * input_game.game_map.height + 300
+# total number of turns, as set by the engine
+def get_total_turn_count():
+    return constants.MAX_TURNS
 
 
 # halite level for each bot at which it tries to deposit it home (linear relationship)
 def return_home_halite_level(input_game):
-    total_turns = get_total_turn_count(input_game)
+    total_turns = get_total_turn_count()
     if input_game.turn_number <= 0.98 * total_turns:
         return constants.MAX_HALITE * 0.9
     else:
@@ -56,76 +55,47 @@ def gridopen(input_game_map, pos, atleast=2):
 
 
 # find the position of the nearest storage point, could be the shipyard or another drop-off
-def get_closest_dropoff(input_me, input_ship):
-    depo = [input_me.shipyard.position]
-    for d in input_me.get_dropoffs():
-        depo.append(d.position)
-
-
-# move randomly to the next available location, check_occupied means be safe before finding nearest random location
-def random_move(input_map, input_ship, reserved_positions, check_occupied=False):
-    options = input_ship.position.get_surrounding_cardinals()
-    random.shuffle(options)
-    found = False
-    for o in options:
-        if check_occupied and not input_map[o].is_occupied and o not in reserved_positions:
-            found = True
-            return o
-        elif o not in reserved_positions:
-            found = True
-            return o
-    if not found:
-        return input_ship.position
+def get_closest_dropoff(input_game, input_ship):
+    return input_game.game_map.get_depot_field(input_game.me).nearest_depot(input_ship.position).position
 
 
 # collects the data on halite_amount at each location in the map
 # returns a list with tuples of (position, halite_amount)
 def resource_graph(input_game):
-    all_resources = []
-    for x in range(input_game.game_map.width):
-        for y in range(input_game.game_map.height):
-            position = Position(x, y)
-            all_resources.append((position, input_game.game_map[position].halite_amount))
-            # all_resources[(x, y)] = input_game.game_map[position].halite_amount
-    all_resources.sort(key=by_halite, reverse=True)
+    # already ranked by the map, richest first
+    all_resources = input_game.game_map.richest.top()
     logging.info("resource graph length %d", len(all_resources))
     return all_resources
 
 
 def get_best_resource_locations(input_game, top = 5):
-    return resource_graph(input_game)[:top]  # return top 5
+    return input_game.game_map.richest.top(top)  # return top 5
 
 
 # probability of reproduction (exponential) decreases as the turn-number increases
 def get_reproduction_rate(input_game):
-    if (input_game.turn_number/get_total_turn_count(input_game)) < 0.20:
+    if (input_game.turn_number/get_total_turn_count()) < 0.20:
         return 0.8
-    elif (input_game.turn_number/get_total_turn_count(input_game)) < 0.30:
+    elif (input_game.turn_number/get_total_turn_count()) < 0.30:
         return 0.7
-    elif (input_game.turn_number/get_total_turn_count(input_game)) < 0.40:
+    elif (input_game.turn_number/get_total_turn_count()) < 0.40:
         return 0.4
-    elif (input_game.turn_number/get_total_turn_count(input_game)) < 0.50:
+    elif (input_game.turn_number/get_total_turn_count()) < 0.50:
         return 0.2
-    elif (input_game.turn_number/get_total_turn_count(input_game)) < 0.70:
+    elif (input_game.turn_number/get_total_turn_count()) < 0.70:
         return 0.1
-    elif (input_game.turn_number/get_total_turn_count(input_game)) < 0.100:
+    elif (input_game.turn_number/get_total_turn_count()) < 0.100:
         return 0.05
     else:
         return 0.0
-    # x = (input_game.turn_number/get_total_turn_count(input_game))*10
+    # x = (input_game.turn_number/get_total_turn_count())*10
     # prob = 256 * pow(0.5, x)
     # return (prob/10.0) - 0.2
 
 
 # find the location of enemy-shipyards and drop-offs
 def get_enemy_shipyards(input_game):
-    all_enemy_shipyards = []
-    for x in range(input_game.game_map.width):
-        for y in range(input_game.game_map.height):
-            position = Position(x, y)
-            if input_game.game_map[position].has_structure and position not in get_all_depos(input_game.me):
-                all_enemy_shipyards.append(position)
-    return all_enemy_shipyards
+    return [structure.position for structure in input_game.occupancy.structures(exclude=input_game.my_id)]
 
 
 # for ordering by the halite amounts in the resource list
@@ -145,15 +115,12 @@ def get_all_depos(input_me):
 # positions that can be potential drop off, top 10 or so from the resource graph
 def get_potential_dropoffs(input_game):
     mean_halite_at_all_locations = []
+    # mean of every cell and its 4 cardinals
+    means = input_game.game_map.get_halite_neighborhood(1).mean
     for x in range(input_game.game_map.width):
         for y in range(input_game.game_map.height):
             position = Position(x, y)
-            halite = input_game.game_map[position].halite_amount
-            cardinals = position.get_surrounding_cardinals()
-            for cardinal in cardinals:
-                halite += input_game.game_map[cardinal].halite_amount
-            mean = halite/5.0
-            mean_halite_at_all_locations.append((position, mean))
+            mean_halite_at_all_locations.append((position, means[position]))
     mean_halite_at_all_locations.sort(key=by_halite, reverse=True)
     dropoffs = mean_halite_at_all_locations[:10]
     return dropoffs
@@ -167,28 +134,42 @@ def get_all_ship_positions(input_me):
     return all_ships
 
 
-center_of_map = Position(round(game.game_map.width/2), round(game.game_map.width/2))
-maximum_distance_possible = game.game_map.calculate_distance(center_of_map, Position(0, 0))  #(from center to edge)
-# logging.info("maximum distance is %s", maximum_distance_possible)
+# set up from the initial game state, see setup()
+center_of_map = None
+maximum_distance_possible = 0
 target_lock = {}
-resource_dict = resource_graph(game)
-# collection of positions that the ships have chosen to take next
-next_positions = []
-# collection of positions where the ships are collecting
-still_positions = []
-# collection of positions where charged ships are
-charged_positions = []
-
-# As soon as you call "ready" function below, the 2 second per turn timer will start.
-game.ready("TheDragonSlayerV6")
-# Now that your bot is initialized, save a message to yourself in the log file with some important information.
-#   Here, you log here your id, which you can always fetch from the game object by using my_id.
-logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
+resource_dict = []
+recall = None
+
+
+def setup(game):
+    """
+    Runs once on the initial game state, before the first turn, and reports the bot ready.
+    :param game: The game object, populated with the initial map data
+    :return: nothing.
+    """
+    global center_of_map, maximum_distance_possible, resource_dict, recall
+    center_of_map = Position(round(game.game_map.width/2), round(game.game_map.width/2))
+    maximum_distance_possible = game.game_map.calculate_distance(center_of_map, Position(0, 0))  #(from center to edge)
+    # logging.info("maximum distance is %s", maximum_distance_possible)
+    resource_dict = resource_graph(game)
+    recall = RecallScheduler(game.game_map, game.me)
+
+    # As soon as you call "ready" function below, the 2 second per turn timer will start.
+    game.ready("TheDragonSlayerV6")
+    # Now that your bot is initialized, save a message to yourself in the log file with some important information.
+    #   Here, you log here your id, which you can always fetch from the game object by using my_id.
+    logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
+
+
 """ <<<Game Loop>>> """
-while True:
-    # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
-    #   running update_frame().
-    game.update_frame()
+
+def turn(game):
+    """
+    Plays one turn.
+    :param game: The game object, refreshed for this turn by update_frame
+    :return: The commands to send for this turn
+    """
     # You extract player metadata and the updated map metadata here for convenience.
     me = game.me
     game_map = game.game_map
@@ -196,8 +177,14 @@ while True:
     #   end of the turn.
     command_queue = []
 
+    # forget the targets of ships that were destroyed since last turn
+    for destroyed_id in me.destroyed_ship_ids:
+        target_lock.pop(destroyed_id, None)
+
     # get a list of all available drop-offs for myself
     all_available_dropoffs = get_all_depos(me)
+    # when each ship must head home to make it back before the game ends
+    recall.update(game.turn_number)
     # a list of best locations
     options = get_best_resource_locations(game, 30)
     # get enemy shipyard and dock information
@@ -223,26 +210,30 @@ while True:
     # a collection of positions of all the ships in my fleet
     all_ship_positions = get_all_ship_positions(me)
 
+    # towards the end, ships may crash into each other on the drop-offs
+    final = recall.is_final(game.turn_number)
+    fleet = MoveResolver(game_map, shared=all_available_dropoffs if final else ())
+
     # reset the bots from last loop after spawning
-    next_positions = []
-    still_positions = []
-    charged_positions = []
+    next_positions = set()
+    still_positions = set()
+    charged_positions = set()
 
     # now, the regular loop of things
     for ship in me.get_ships():
         if (game_map[ship.position].halite_amount >= 0.01 * constants.MAX_HALITE and ship.id not in target_lock) or \
                 (ship.halite_amount < 0.1 * game_map[ship.position].halite_amount):
-            still_positions.append(ship.position)
+            still_positions.add(ship.position)
         if ship.id in target_lock and ship.position not in all_available_dropoffs:
             next_pos = None
             target_lock_choices = ship.position.get_surrounding_cardinals()
             dist = inf
             for tlc in target_lock_choices:
-                if tlc not in (still_positions + charged_positions):
+                if tlc not in still_positions and tlc not in charged_positions:
                     if game_map.calculate_distance(tlc, target_lock[ship.id]) < dist:
                         dist = game_map.calculate_distance(tlc, target_lock[ship.id])
                         next_pos = tlc
-            charged_positions.append(next_pos)
+            charged_positions.add(next_pos)
 
     for ship in me.get_ships():
         logging.info("captain's log %d", ship.id)
@@ -252,14 +243,12 @@ while True:
         if ship.id in target_lock and (ship.position == target_lock[ship.id]):
             target_lock.pop(ship.id)
 
-        if (ship.halite_amount >= return_home_halite_level(game) or game.turn_number > get_total_turn_count(game) * 0.99) and ship.id not in target_lock:
-            closest = inf
-            target = me.shipyard.position
-            for depo in all_available_dropoffs:
-                if game_map.calculate_distance(ship.position, depo) < closest:
-                    closest = game_map.calculate_distance(ship.position, depo)
-                    target = depo
-                    logging.info("target %s", target)
+        recalled = recall.is_recalled(ship.id, game.turn_number)
+        if (ship.halite_amount >= return_home_halite_level(game) or recalled) and ship.id not in target_lock:
+            depot_field = game_map.get_depot_field(me)
+            closest = depot_field.distance_at(ship.position)
+            target = recall.depot(ship.id) if recalled else depot_field.nearest_depot(ship.position).position
+            logging.info("target %s", target)
             if potential_dropoff_location is not None and game_map.calculate_distance(ship.position, potential_dropoff_location) < closest and me.halite_amount > constants.DROPOFF_COST * 2:
                 logging.info("got potential new drop off")
                 target = potential_dropoff_location
@@ -301,7 +290,7 @@ while True:
             target_lock_choices = ship.position.get_surrounding_cardinals()
             dist = inf
             for tlc in target_lock_choices:
-                if tlc not in (next_positions + still_positions):  # do not check charded positins here
+                if tlc not in next_positions and tlc not in still_positions:  # do not check charded positins here
                     if game_map.calculate_distance(tlc, target_lock[ship.id]) < dist:
                         dist = game_map.calculate_distance(tlc, target_lock[ship.id])
                         next_pos = tlc
@@ -319,68 +308,30 @@ while True:
             random.shuffle(target_lock_choices)
             dist = inf
             for tlc in target_lock_choices:
-                if tlc not in (next_positions + still_positions + charged_positions):
+                if tlc not in next_positions and tlc not in still_positions and tlc not in charged_positions:
                     if game_map.calculate_distance(tlc, best_option) < dist:
                         dist = game_map.calculate_distance(tlc, best_option)
                         next_pos = tlc
                         navigated = True
                         logging.info("level 3, nearest jewel")
 
-        # # if at the shipyard then get out of there as soon as possible
-        if next_pos == ship.position:
-            if ship.position == me.shipyard.position or \
-                    (gridlock(game_map, me.shipyard.position, 4) and ship.position in me.shipyard.position.get_surrounding_cardinals()):
-                next_pos = random_move(game_map, ship, next_positions + still_positions + charged_positions)
-                logging.info("level 4, random move")
-
-        if next_pos == ship.position and gridopen(game_map, ship.position) and game_map[ship.position].halite_amount == 0:
-            next_pos = random_move(game_map, ship, next_positions + still_positions + charged_positions)
-            logging.info("level 5, random move")
+        # if at the shipyard then get out of there as soon as possible, and leave empty cells when there is room
+        wander = next_pos == ship.position and (
+            ship.position == me.shipyard.position or
+            (gridlock(game_map, me.shipyard.position, 4) and ship.position in me.shipyard.position.get_surrounding_cardinals()) or
+            (gridopen(game_map, ship.position) and game_map[ship.position].halite_amount == 0))
 
-        # enemy ship found, avoid it
-        if game_map[next_pos].is_occupied and next_pos not in all_ship_positions and next_pos not in all_available_dropoffs:
-            next_pos = random_move(game_map, ship, next_positions + still_positions + charged_positions, check_occupied=True)
-            logging.info("level 5, random move")
+        # towards the end, crash onto the drop-off
+        if final and ship.id in target_lock and ship.position in target_lock[ship.id].get_surrounding_cardinals():
+            next_pos = target_lock[ship.id]
+        next_positions.add(next_pos)
 
-        next_direction = game_map.naive_navigate(ship, next_pos)
-
-        safe_direction = game_map.naive_navigate(ship, next_pos)
-        unsafe_directions = game_map.get_unsafe_moves(ship.position, next_pos)
-
-        if safe_direction in unsafe_directions:
-            next_direction = safe_direction
-        else:
-            next_direction = (unsafe_directions + [safe_direction])[0]
-
-        # if at a gridlock and need to break it, kill own ship
-        if ship.id in target_lock and gridlock(game_map, target_lock[ship.id], 4) and next_pos == target_lock[ship.id]:
-            next_direction = (game_map.get_unsafe_moves(ship.position, next_pos) + [game_map.naive_navigate(ship, next_pos)])[0]
-
-        # update the list of positions the bots will take
-        if next_direction == Direction.Still:
-            logging.info("Ship is STILL")
-            if ship.position in next_positions:
-                logging.info("PROBLEM ENCOUNTERED")
-                logging.info("ship %d wants to move to %s", ship.id, next_pos)
-                logging.info(next_positions)
-            next_positions.append(ship.position)
-        else:
-            if next_pos in next_positions:
-                logging.info("PROBLEM ENCOUNTERED")
-                logging.info("ship %d wants to move to %s", ship.id, next_pos)
-                logging.info(next_positions)
-            next_positions.append(next_pos)
-
-        if game.turn_number > get_total_turn_count(game) * 0.97 and ship.id in target_lock and ship.position in target_lock[ship.id].get_surrounding_cardinals():
-            next_direction = (game_map.get_unsafe_moves(ship.position, target_lock[ship.id]) + [game_map.naive_navigate(ship, target_lock[ship.id])])[0]
-            if ship.position == target_lock[ship.id]:
-                next_direction == Direction.Still
-
-        # finally update the next direction
-        if next_direction == Direction.Still:
-            command_queue.append(ship.stay_still())
-        else:
-            command_queue.append(ship.move(next_direction))
+        # stay clear of enemy ships, and let the fleet resolver settle any conflicts between my ships
+        moves = ship.position.get_surrounding_cardinals()
+        random.shuffle(moves)
+        moves = [p for p in ([] if wander else [next_pos, ship.position]) + moves + [ship.position]
+                 if not (game_map[p].is_occupied and p not in all_ship_positions and p not in all_available_dropoffs)]
+        fleet.request(ship, moves)
 
         if game.turn_number == 2:
             logging.info("the shipyard is at %s", me.shipyard.position)
@@ -388,15 +339,31 @@ while True:
         logging.info("this is ship number %d at position %s and is going to %s", ship.id, ship.position, next_pos)
         logging.info ("this ship was navigated? %s", navigated)
 
+    command_queue.extend(fleet.commands())
+
     # If I have enough halite and the probability distribution gives be a true value, spawn a ship.
     # Don't spawn a ship if currently have a ship at port.
     create_new_bot = False  # First set the new bot creation indicator as False
     if me.halite_amount >= constants.SHIP_COST \
             and me.shipyard.position not in all_ship_positions \
-            and me.shipyard.position not in next_positions + still_positions + charged_positions \
+            and me.shipyard.position not in fleet.resolve().values() \
             and gridopen(game_map, me.shipyard.position, 2) \
             and random.random() <= get_reproduction_rate(game):
         create_new_bot = True
         command_queue.append(me.shipyard.spawn())
-    # Send your moves back to the game environment, ending this turn.
-    game.end_turn(command_queue)
+    return command_queue
+
+
+if __name__ == "__main__":
+    # This game object contains the initial game state.
+    game = hlt.Game()
+    setup(game)
+    # Send safe moves rather than time out when a turn runs long
+    game.guard_deadline()
+
+    while True:
+        # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
+        #   running update_frame().
+        game.update_frame()
+        # Send your moves back to the game environment, ending this turn.
+        game.end_turn(game.run_strategy(turn))
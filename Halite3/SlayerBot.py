@@ -10,6 +10,19 @@ from hlt import constants
 # This library contains direction metadata to better interface with the game.
 from hlt.positionals import Direction, Position
 
+# Turns every ship's ranked wishes into collision-free moves
+from hlt.fleet import MoveResolver
+# Risk of every cell from the enemy ships around
+from hlt.threat import ThreatField
+# Multi-turn paths that ships reserve so as not to run into each other
+from hlt.cooperative import CooperativePlanner
+# Arrival queue and lanes of the shipyard
+from hlt.traffic import DepotTraffic
+# When each ship heads home at the end of the game
+from hlt.recall import RecallScheduler
+# Improves the ships' targets for as long as the turn allows
+from hlt.planning import AnytimePlanner, swap_improvements
+
 import random
 from math import inf
 
@@ -18,9 +31,9 @@ from math import inf
 import logging
 
 """ <<<Initialize all functions>>> """
-# total number of turns based on the grid size (linear relationship)
-def get_total_turn_count(height):
-    return 3.125 * height + 300
+# total number of turns, as set by the engine
+def get_total_turn_count():
+    return constants.MAX_TURNS
 
 
 # to check for gridlocks at a certain position "in_position"
@@ -82,36 +95,16 @@ def directed_move(input_map, input_ship, destination, reserved_positions, includ
 # collects the data on halite_amount at each location in the map
 # returns a list with tuples of (position, halite_amount)
 def resource_graph(input_game):
-    all_resources = []
-    for x in range(input_game.game_map.width):
-        for y in range(input_game.game_map.height):
-            position = Position(x, y)
-            all_resources.append((position, input_game.game_map[position].halite_amount))
-            # all_resources[(x, y)] = input_game.game_map[position].halite_amount
-    all_resources.sort(key=by_halite, reverse=True)
+    # already ranked by the map, richest first
+    all_resources = input_game.game_map.richest.top()
     return all_resources
 
-def get_neighborhood(input_game_map, pos, radius = 2):
-    neighborhood = []
-    x_min, y_min = pos.x - radius, pos.y - radius
-    x_max, y_max = pos.x + radius, pos.y + radius
-    for x in range(x_min, x_max + 1):
-        for y in range(y_min, y_max + 1):
-            position = input_game_map.normalize(Position(x, y))
-            if input_game_map.calculate_distance(pos, position) <= radius:
-                neighborhood.append(position)
-    return neighborhood
-
 def mean_halite(in_game_map, pos, radius):
-    halite_at_pos = in_game_map[pos].halite_amount
-    surrounding = get_neighborhood(in_game_map, pos, radius)
-    for p in  surrounding:
-        halite_at_pos += in_game_map[p].halite_amount
-    return halite_at_pos/len(surrounding)
+    return in_game_map.get_halite_neighborhood(radius).mean[pos]
 
 
 def get_best_resource_locations(input_game, top = 5):
-    rg = resource_graph(input_game)[:top]  # return top 5
+    rg = input_game.game_map.richest.top(top)  # return top 5
     final_rg = []
     for x in rg:
         mean_at = mean_halite(input_game.game_map, x[0], 3)
@@ -129,19 +122,34 @@ def find_best_resource_location(pos, resource_collection):
     return best_opts
 
 
+# give each ship a rich location of its own, the nearest or next nearest still free by its hunter level,
+# then let the planner swap targets between ships for as long as that shortens their trips
+def assign_resource_targets(input_game, ships, resource_collection):
+    targets = {}
+    claimed = set()
+    for shp in ships:
+        free_options = [opt for opt in find_best_resource_location(shp.position, resource_collection)
+                        if opt[0] not in claimed] or find_best_resource_location(shp.position, resource_collection)
+        targets[shp.id] = free_options[min(hunter_level[shp.id], len(free_options) - 1)][0]
+        claimed.add(targets[shp.id])
+    positions = {shp.id: shp.position for shp in ships}
+    trip = lambda ship_id, target: input_game.game_map.calculate_distance(positions[ship_id], target)
+    return planner.improve(targets, lambda plan: swap_improvements(plan, trip))
+
+
 # probability of reproduction (exponential) decreases as the turn-number increases
-def get_reproduction_rate(turn_number, height):
-    if (turn_number/get_total_turn_count(height)) < 0.20:
+def get_reproduction_rate(turn_number):
+    if (turn_number/get_total_turn_count()) < 0.20:
         return 0.9
-    elif (turn_number/get_total_turn_count(height)) < 0.30:
+    elif (turn_number/get_total_turn_count()) < 0.30:
         return 0.8
-    elif (turn_number/get_total_turn_count(height)) < 0.40:
+    elif (turn_number/get_total_turn_count()) < 0.40:
         return 0.7
-    elif (turn_number/get_total_turn_count(height)) < 0.50:
+    elif (turn_number/get_total_turn_count()) < 0.50:
         return 0.5
-    elif (turn_number/get_total_turn_count(height)) < 0.70:
+    elif (turn_number/get_total_turn_count()) < 0.70:
         return 0.3
-    elif (turn_number/get_total_turn_count(height)) < 0.100:
+    elif (turn_number/get_total_turn_count()) < 0.100:
         return 0.1
     else:
         return 0.0
@@ -152,13 +160,7 @@ def get_reproduction_rate(turn_number, height):
 
 # find the location of enemy-shipyards and drop-offs
 def get_enemy_shipyards(input_game):
-    all_enemy_shipyards = []
-    for x in range(input_game.game_map.width):
-        for y in range(input_game.game_map.height):
-            position = Position(x, y)
-            if input_game.game_map[position].has_structure and position not in get_all_depos(input_game.me):
-                all_enemy_shipyards.append(position)
-    return all_enemy_shipyards
+    return [structure.position for structure in input_game.occupancy.structures(exclude=input_game.my_id)]
 
 
 # for ordering by the halite amounts in the resource list
@@ -177,14 +179,7 @@ def get_all_depos(input_me):
 
 # find the closest storage facility
 def get_closest_drop_off(input_game, pos):
-    all_depos = get_all_depos(input_game.me)
-    closest_depo = input_game.me.shipyard.position
-    d = inf
-    for depo in all_depos:
-        if input_game.game_map.calculate_distance(pos, depo) < d:
-            d = input_game.game_map.calculate_distance(pos, depo)
-            closest_depo = depo
-    return closest_depo
+    return input_game.game_map.get_depot_field(input_game.me).nearest_depot(pos).position
 
 
 # get the current positions where I have a ships
@@ -227,42 +222,42 @@ def get_neighborhood_enemy_details(input_game_map, position, radius, own_positio
     return enemy_map
 
 
-def get_enemy_ship_locations(input_game_map, my_ships_and_depos, height, dont_check_positions = []):
-    enemy_ships = []
-    for x in range(height):
-        for y in range(height):
-            position = Position(x, y)
-            if position not in dont_check_positions:
-                if input_game_map[position].is_occupied and position not in my_ships_and_depos:
-                    enemy_ships.append(position)
+def get_enemy_ship_locations(input_game, dont_check_positions=frozenset()):
+    enemy_ships = set()
+    for enemy in input_game.occupancy.ships(exclude=input_game.my_id):
+        if enemy.position not in dont_check_positions:
+            enemy_ships.add(enemy.position)
     return enemy_ships
 
-# get a list of positions where enemy bots might move to, takes the position of enemy bots as input
-def collision_zone(input_game_map, enemy):
-    col_list = []
-    for e in enemy:
-        cardinals = e.get_surrounding_cardinals()
-        for c in cardinals:
-            col_list.append(input_game_map.normalize(c))
-    return col_list
+# get the risk of every cell from the enemy bots, and the positions they might move to
+def collision_zone(input_game, dont_check_positions=frozenset()):
+    enemy = [e for e in input_game.occupancy.ships(exclude=input_game.my_id) if e.position not in dont_check_positions]
+    return ThreatField(input_game, enemy)
 
 """ <<<Game Established>>> """
-# This game object contains the initial game state.
-game = hlt.Game()
+# This game object contains the initial game state, see setup()
+game = None
 
 """ <<< Map Variables and Functions >>> """
 # maximum distance between two points in the map
-maximum_distance_possible = game.game_map.calculate_distance(Position(round(game.game_map.width/2), round(game.game_map.width/2)), Position(0, 0))
+maximum_distance_possible = 0
 
-# check the total resources available in the map
+# the total resources available in the map
 total_available_resources = 0
-for r in resource_graph(game):
-    total_available_resources += r[1]
 
 # bots that re designed to go to a specific place
 # usually delivery bots go to drop-offs
 delivery_bots = {} # {ship.id : destination.position}
 
+# multi-turn paths of the delivery bots, see setup()
+delivery_paths = None
+
+# the end-game recall of every ship, see setup()
+recall = None
+
+# the arrival queue and lanes of every drop-off this turn
+depot_traffic = {} # {drop-off position : DepotTraffic}
+
 # next positions that ships will take
 ship_navigation = {} # {ship.id : ship.position}
 
@@ -291,9 +286,9 @@ def activate_delivery_bots(in_game):
         # get the closest drop-off locaition
         closest_drop_off = get_closest_drop_off(game, ship.position)
 
-        # If towards the end, make everyone go to the deposit
-        if in_game.turn_number >= 0.94 * get_total_turn_count(in_game.game_map.height):
-            delivery_bots[ship.id] = closest_drop_off
+        # If towards the end, make everyone go to the deposit in time to arrive in the last turns
+        if recall.is_recalled(ship.id, in_game.turn_number):
+            delivery_bots[ship.id] = recall.depot(ship.id)
 
         # Free up hoarding ships that just deposited halite
         if ship.position in all_available_dropoffs and ship.id in delivery_bots:
@@ -330,30 +325,65 @@ def activate_delivery_bots(in_game):
 
 # find Gatherers, they retain their positions
 def find_paralyzed_bots(in_game):
-    positions = []
+    positions = set()
     for ship in in_game.me.get_ships():
         if in_game.game_map[ship.position].halite_amount * 0.1 > ship.halite_amount:
             logging.info("ship %d is paralyzed, at position %s", ship.id, ship.position)
             ship_navigation[ship.id] = ship.position
-            positions.append(ship.position)
+            positions.add(ship.position)
             paralyzed_bots.append(ship.id)
     return positions
 
 # avoid the restricted positions (gatherers)
 def get_moves_delivery_bots(in_game, reserved_positions):
-    positions = []
+    positions = set()
+    delivery_paths.begin_turn(in_game.turn_number)
+    final = recall.is_final(in_game.turn_number)
     for ship in in_game.me.get_ships():
-        if ship.id in delivery_bots and ship.position not in all_available_dropoffs:
-            next_position = directed_move(in_game.game_map, ship, delivery_bots[ship.id], reserved_positions + positions + enemy_bots, include_self=True)
+        if final and ship.position in all_available_dropoffs and recall.is_recalled(ship.id, in_game.turn_number):
+            # at the very end, stay on the drop-off and let the others crash onto it
+            ship_navigation[ship.id] = ship.position
+            positions.add(ship.position)
+        elif ship.id in delivery_bots and ship.position not in all_available_dropoffs:
+            if final and recall.is_recalled(ship.id, in_game.turn_number):
+                # at the very end, head straight home: the drop-offs take any number of ships
+                next_position = recall.next_position(ship)
+            else:
+                # follow the path home reserved over the next turns, around the other delivery bots' paths
+                # if the drop-off is taken when the bot could get there, wait on its lane for its slot instead
+                goal = delivery_bots[ship.id]
+                traffic = depot_traffic.get(goal)
+                if traffic is not None and traffic.lane(ship.id) is not None \
+                        and traffic.slot(ship.id) > in_game.turn_number + in_game.game_map.calculate_distance(ship.position, goal):
+                    goal = traffic.lane(ship.id)
+                blocked = reserved_positions | positions | enemy_bots
+                next_position = delivery_paths.next_position(ship, goal, blocked)
             ship_navigation[ship.id] = next_position
-            positions.append(next_position)
+            positions.add(next_position)
             logging.info("ship %d is a delivery bot, from position %s, going to %s", ship.id, ship.position, next_position)
     return positions
 
+# queue the delivery bots heading to each drop-off by the turn their path gets there, giving each
+# a slot on the drop-off and a lane to wait on, and to know when the yard is free for a new ship
+def schedule_depot_traffic(in_game):
+    depot_traffic.clear()
+    for depot in all_available_dropoffs:
+        traffic = depot_traffic[depot] = DepotTraffic(in_game.game_map, depot, in_game.turn_number)
+        arrivals = []
+        for ship in in_game.me.get_ships():
+            if delivery_bots.get(ship.id) == depot and ship.position != depot:
+                # last turn's path may only lead to the lane the bot waits on, next to the drop-off
+                eta, goal = delivery_paths.arrival(ship.id), delivery_paths.goal(ship.id)
+                if eta is not None and goal != depot:
+                    eta += in_game.game_map.calculate_distance(goal, depot)
+                arrivals.append((ship, eta))
+        departures = [ship for ship in in_game.me.get_ships() if ship.position == depot]
+        traffic.schedule(arrivals, departures)
+
 # If Hunter, get directions
 def get_moves_hunter_bots(in_game, reserved_positions):
-    positions = []
-    all_occupied_positions = []
+    positions = set()
+    all_occupied_positions = set()
     for ship in in_game.me.get_ships():
         halite_at_position = in_game.game_map[ship.position].halite_amount
         if ship.id not in delivery_bots and ship.id not in paralyzed_bots:
@@ -372,7 +402,7 @@ def get_moves_hunter_bots(in_game, reserved_positions):
                 min_halite = 0.01
 
             if in_game.game_map[ship.position].halite_amount >= min_halite * constants.MAX_HALITE:
-                next_position = directed_move(in_game.game_map, ship, ship.position, reserved_positions + positions + enemy_bots,
+                next_position = directed_move(in_game.game_map, ship, ship.position, reserved_positions | positions | enemy_bots,
                                          include_self=True)
             threshold = 0.5
             if in_game.turn_number < 20:
@@ -388,13 +418,13 @@ def get_moves_hunter_bots(in_game, reserved_positions):
                 op = in_game.game_map.normalize(op)
                 neighbor_halite = game_map[op].halite_amount
                 logging.info("the run number is %d and the threshold is %s", game.turn_number, threshold)
-                if 0.01 * constants.MAX_HALITE < halite_at_position < neighbor_halite * threshold and op not in (reserved_positions + positions):
+                if 0.01 * constants.MAX_HALITE < halite_at_position < neighbor_halite * threshold and op not in reserved_positions and op not in positions:
                     if neighbor_halite > best_halite:
                         best_halite = neighbor_halite
                         next_position = op
             if next_position is not None:
                 ship_navigation[ship.id] = next_position
-                positions.append(next_position)
+                positions.add(next_position)
                 if next_position == ship.position:
                     gatherer_bots.append(ship.id)
                     logging.info("ship %d is a gatherer bot, from position %s, going to %s", ship.id, ship.position,
@@ -404,20 +434,43 @@ def get_moves_hunter_bots(in_game, reserved_positions):
                     logging.info("ship %d is a hunter bot, from position %s, going to %s", ship.id, ship.position,
                                  next_position)
         if ship.id in ship_navigation:
-            all_occupied_positions.append(ship_navigation[ship.id])
+            all_occupied_positions.add(ship_navigation[ship.id])
     return all_occupied_positions
 
 """ <<<The game will now start playing>>> """
 
-game.ready("MyPythonBot")
-logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
+def setup(new_game):
+    """
+    Runs once on the initial game state, before the first turn, and reports the bot ready.
+    :param new_game: The game object, populated with the initial map data
+    :return: nothing.
+    """
+    global game, maximum_distance_possible, total_available_resources, delivery_paths, recall, planner
+    game = new_game
+    delivery_paths = CooperativePlanner(game.game_map)
+    recall = RecallScheduler(game.game_map, game.me)
+    planner = AnytimePlanner(game)
+
+    # maximum distance between two points in the map
+    maximum_distance_possible = game.game_map.calculate_distance(Position(round(game.game_map.width/2), round(game.game_map.width/2)), Position(0, 0))
+
+    # check the total resources available in the map
+    total_available_resources = 0
+    for r in resource_graph(game):
+        total_available_resources += r[1]
+
+    game.ready("MyPythonBot")
+    logging.info("Successfully created bot! My Player ID is {}.".format(game.my_id))
 
 """ <<<Game Loop>>> """
 
-while True:
-    # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
-    #   running update_frame().
-    game.update_frame()
+def turn(game):
+    """
+    Plays one turn.
+    :param game: The game object, refreshed for this turn by update_frame
+    :return: The commands to send for this turn
+    """
+    global game_map, all_available_dropoffs, enemy_bots, create_dropoff
     # You extract player metadata and the updated map metadata here for convenience.
     me = game.me
     game_map = game.game_map
@@ -425,6 +478,11 @@ while True:
     """<<<Main Navigation Dictionary Refresh>>>"""
     ship_navigation.clear()
 
+    # forget the ships that were destroyed since last turn
+    for destroyed_id in me.destroyed_ship_ids:
+        delivery_bots.pop(destroyed_id, None)
+        hunter_level.pop(destroyed_id, None)
+
     """<<<All Bot Types Refresh >>>"""
     # scout ships, that will make the kessel run in 12 parsecs
     paralyzed_bots.clear()
@@ -445,8 +503,8 @@ while True:
     # collection of positions of all the ships in my fleet
     all_ship_positions = get_all_ship_positions(me)
 
-    # get a list of all available drop-offs in my fleet
-    all_available_dropoffs = get_all_depos(me)
+    # get a set of all available drop-offs in my fleet
+    all_available_dropoffs = set(get_all_depos(me))
 
     # set up time for creating dropoff
     create_dropoff = False
@@ -459,12 +517,13 @@ while True:
 
 
     # get the location of all enemy ships
-    enemy_bots = get_enemy_ship_locations(game_map, all_ship_positions + all_available_dropoffs, game_map.height, all_available_dropoffs)
+    enemy_bots = get_enemy_ship_locations(game, all_available_dropoffs)
 
     # positions that can result in collision
     # the possible movable spaces of enemy bots is prone to collision
     # we try to protect our delivery bots from collision at least
-    collision_prone = collision_zone(game_map, enemy_bots)
+    threat = collision_zone(game, all_available_dropoffs)
+    collision_prone = threat.contested_positions()
 
     # # get the list of best resource location (game, "top")
     # best_resources = get_best_resource_locations(game, 100)
@@ -474,6 +533,9 @@ while True:
 
     """ <<<Find the Next positions to occupy>>> """
 
+    # schedule when each bot must head home to make it back before the game ends
+    recall.update(game.turn_number)
+
     # activate any bot that might want to go home or free the bot that wants to start gathering
     activate_delivery_bots(game)
 
@@ -482,17 +544,30 @@ while True:
 
     # now activate the hunter bots
     # return positions of every bot so fat, not just hunter bots
-    next_positions = get_moves_hunter_bots(game, paralyzed_bots_next_positions + enemy_bots + collision_prone)
+    next_positions = get_moves_hunter_bots(game, paralyzed_bots_next_positions | enemy_bots | collision_prone)
+
+    # the turns each drop-off is taken by returning bots, and its lanes in and out
+    schedule_depot_traffic(game)
+    yard_traffic = depot_traffic[me.shipyard.position]
+    inbound_lanes = {lane for traffic in depot_traffic.values() for lane in traffic.inbound}
 
     # get next position for bots that are trying to deliver payload
     # we give them the next priority because we dont want them still
     # its a waste of time to make them wait
     # these bots must not collide with the paralyzed bots
-    next_positions = next_positions + get_moves_delivery_bots(game, next_positions + enemy_bots + collision_prone)
+    next_positions |= get_moves_delivery_bots(game, next_positions | enemy_bots | collision_prone)
+
+    # towards the end, ships may crash into each other on the drop-offs
+    end_game = recall.is_final(game.turn_number)
+    fleet = MoveResolver(game_map, shared=all_available_dropoffs if end_game else ())
 
     # all bots not covered by the above are called confused bots
+    # send each to a rich location of its own
+    resource_targets = assign_resource_targets(game, [shp for shp in me.get_ships() if shp.id not in ship_navigation],
+                                               rich_locations)
+
     # find next position for confused bots
-    # set up directions for every bot, and add to the command_queue
+    # set up moves for every bot, and let the fleet resolver settle any conflicts
     for shp in me.get_ships():
         closest_drop_off_position = get_closest_drop_off(game, shp.position)
         if shp.id not in ship_navigation:
@@ -500,39 +575,57 @@ while True:
             # next_pos = None
             # get_neighborhood_halite_details(game_map, shp.position, 2)
             # if game_map[shp.position].halite_amount < 0.025 * constants.MAX_HALITE and random.random() <= 0.7 :
-            best_options = find_best_resource_location(shp.position, rich_locations)
+            # best_options = find_best_resource_location(shp.position, rich_locations)
             # best_options = best_option[:1]
             # random.shuffle(best_options)
 
-            next_pos = directed_move(game_map, shp, best_options[hunter_lvl][0], next_positions + collision_prone + enemy_bots, include_self=True)
-            logging.info("best option for the bot to go to is %s", best_options[hunter_lvl][0])
+            next_pos = directed_move(game_map, shp, resource_targets[shp.id], next_positions | collision_prone | enemy_bots, include_self=True)
+            logging.info("best option for the bot to go to is %s (hunter level %d)", resource_targets[shp.id], hunter_lvl)
             logging.info("ship %d is a nothing bot, from position %s, doing directed move, going to %s", shp.id, shp.position, next_pos)
             if next_pos in next_positions:
                 logging.info("PROBLEM")
-            next_positions.append(next_pos)
+            next_positions.add(next_pos)
             ship_navigation[shp.id] = next_pos
             confused_bots.append(shp.id)
 
-        next_direction = (game_map.get_unsafe_moves(shp.position, ship_navigation[shp.id]) + [game_map.naive_navigate(shp, ship_navigation[shp.id])])[0]
+        preferred_position = ship_navigation[shp.id]
+        if end_game and shp.position in closest_drop_off_position.get_surrounding_cardinals():
+            preferred_position = closest_drop_off_position
 
-        if game.turn_number >= 0.94 * get_total_turn_count(game_map.height) and shp.position in closest_drop_off_position.get_surrounding_cardinals():
-            next_direction = game_map.get_unsafe_moves(shp.position, closest_drop_off_position)[0]
+        # if the preferred cell is taken, settle for the safe cell closest to it, leaving a drop-off by the lane
+        # given, off the inbound lanes and the least threatened first; cells across the map's edge are
+        # normalized, as the lanes are
+        lane = depot_traffic[shp.position].lane(shp.id) if shp.position in depot_traffic else None
+        alternatives = sorted([game_map.normalize(p) for p in shp.position.get_surrounding_cardinals() + [shp.position]],
+                              key=lambda p: (game_map.calculate_distance(p, preferred_position), p != lane,
+                                             p in inbound_lanes, threat[p]))
+        fleet.request(shp, [preferred_position] + [p for p in alternatives if not threat.is_dangerous(p)])
 
-        if next_direction == Direction.Still:
-            command_queue.append(shp.stay_still())
-        else:
-            command_queue.append(shp.move(next_direction))
+    command_queue.extend(fleet.commands())
 
     """ <<<Spawn New Ship>>> """
     # If I have enough halite and the probability distribution gives be a true value, spawn a ship.
-    # Don't spawn a ship if currently have a ship at port.
+    # Don't spawn a ship if currently have a ship at port, or if it would have no lane out of the yard.
     if me.halite_amount >= constants.SHIP_COST \
             and me.shipyard.position not in all_ship_positions \
-            and me.shipyard.position not in next_positions \
-            and gridopen(game_map, me.shipyard.position, 2) \
-            and random.random() <= get_reproduction_rate(game.turn_number, game_map.height):
+            and me.shipyard.position not in fleet.resolve().values() \
+            and random.random() <= get_reproduction_rate(game.turn_number) \
+            and yard_traffic.claim_spawn(set(fleet.resolve().values())):
         command_queue.append(me.shipyard.spawn())
 
-    # Send moves back to the game environment, ending this turn.
-    game.end_turn(command_queue)
+    return command_queue
+
+
+if __name__ == "__main__":
+    # This game object contains the initial game state.
+    game = hlt.Game()
+    setup(game)
+    # Send safe moves rather than time out when a turn runs long
+    game.guard_deadline()
 
+    while True:
+        # This loop handles each turn of the game. The game object changes every turn, and you refresh that state by
+        #   running update_frame().
+        game.update_frame()
+        # Send your moves back to the game environment, ending this turn.
+        game.end_turn(game.run_strategy(turn))
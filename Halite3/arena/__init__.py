@@ -0,0 +1,8 @@
+"""
+Local game engine and match tooling for playing bots against each other
+without the bundled halite executable.
+
+Run a game with: python3 -m arena --width 32 --height 32 "python3 MyBot.py" "python3 MyBot.py"
+"""
+from .engine import Match, default_constants
+from .mapgen import generate_map
@@ -0,0 +1,73 @@
+"""
+Command line interface mirroring the options of the halite executable, e.g.
+
+    python3 -m arena --width 32 --height 32 --seed 42 "python3 MyBot.py" "python3 MyBot.py"
+
+With --in-process, the bots are loaded into this process instead (see arena.inprocess).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+from .mapgen import MAP_SIZES
+from .runner import run_game, resolve_command, INIT_TIMEOUT, TURN_TIMEOUT
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python3 -m arena", description="Play a local game of Halite III.")
+    parser.add_argument("bots", nargs="+", help="command line of each bot (2 or 4)")
+    parser.add_argument("--width", type=int, help="map width (default: a random competition size)")
+    parser.add_argument("--height", type=int, help="map height (default: the width)")
+    parser.add_argument("-s", "--seed", type=int, help="map seed (default: random)")
+    parser.add_argument("--turn-limit", type=int, help="stop after this many turns")
+    parser.add_argument("--no-timeout", action="store_true", help="let bots take as long as they want")
+    parser.add_argument("--in-process", action="store_true",
+                        help="load the bot scripts into this process instead of running them (no timeouts)")
+    parser.add_argument("--results-as-json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--no-logs", action="store_true",
+                        help="run the bots from a temporary directory, discarding the bot-N.log files they write")
+    # Accepted for compatibility with the halite executable; this engine writes no replays
+    parser.add_argument("-v", "--verbosity", action="count", default=0, help=argparse.SUPPRESS)
+    parser.add_argument("-i", "--replay-directory", help=argparse.SUPPRESS)
+    parser.add_argument("--no-replay", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if len(args.bots) not in (2, 4):
+        parser.error("Halite is played by 2 or 4 bots")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    seed = args.seed if args.seed is not None else random.randrange(1 << 31)
+    width = args.width or args.height or random.Random(seed).choice(MAP_SIZES)
+    height = args.height or width
+
+    if args.in_process:
+        # Bots loaded into this process log through its own logging setup, not to files
+        from . import inprocess
+        results = inprocess.run_game(args.bots, width, height, seed, turn_limit=args.turn_limit)
+    else:
+        commands, directory = args.bots, None
+        with tempfile.TemporaryDirectory() as scratch:
+            if args.no_logs:
+                commands, directory = [resolve_command(command, os.getcwd()) for command in args.bots], scratch
+            results = run_game(commands, width, height, seed,
+                               turn_timeout=None if args.no_timeout else TURN_TIMEOUT,
+                               init_timeout=None if args.no_timeout else INIT_TIMEOUT,
+                               turn_limit=args.turn_limit, cwd=directory)
+
+    if args.results_as_json:
+        print(json.dumps(results, indent=4, sort_keys=True))
+        return
+    print("Map seed {}, {}x{}, {} turns".format(seed, width, height, results["turns"]))
+    for player_id, stats in sorted(results["stats"].items(), key=lambda item: item[1]["rank"]):
+        print("Player {} ({}): rank {}, {} halite{}".format(
+            player_id, results["names"].get(player_id, args.bots[int(player_id)]), stats["rank"], stats["score"],
+            ", " + results["error_logs"][player_id] if player_id in results["error_logs"] else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,402 @@
+"""
+The rules of Halite III: mining, move costs, inspiration, collisions, dropoffs and spawning.
+
+A Match holds the whole game state. It produces the exact text the official engine
+sends to bots (init_lines and frame_lines) and applies the commands they send back
+(process_turn). Talking to the bots themselves is left to the runners.
+"""
+import json
+import math
+
+from .mapgen import generate_map
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+DIRECTIONS = {'n': (0, -1), 's': (0, 1), 'e': (1, 0), 'w': (-1, 0), 'o': (0, 0)}
+
+
+def max_turns(width, height):
+    """
+    :return: The game length for a map size: 400 turns on 32x32 up to 500 turns on 64x64
+    """
+    return 400 + 25 * (max(width, height) - 32) // 8
+
+
+def default_constants(width, height):
+    """
+    :return: The constants the official engine sends for a map size
+    """
+    return {
+        "CAPTURE_ENABLED": False,
+        "CAPTURE_RADIUS": 3,
+        "DEFAULT_MAP_HEIGHT": height,
+        "DEFAULT_MAP_WIDTH": width,
+        "DROPOFF_COST": 4000,
+        "DROPOFF_PENALTY_RATIO": 4,
+        "EXTRACT_RATIO": 4,
+        "FACTOR_EXP_1": 2.0,
+        "FACTOR_EXP_2": 2.0,
+        "INITIAL_ENERGY": 5000,
+        "INSPIRATION_ENABLED": True,
+        "INSPIRATION_RADIUS": 4,
+        "INSPIRATION_SHIP_COUNT": 2,
+        "INSPIRED_BONUS_MULTIPLIER": 2.0,
+        "INSPIRED_EXTRACT_RATIO": 4,
+        "INSPIRED_MOVE_COST_RATIO": 10,
+        "MAX_CELL_PRODUCTION": 1000,
+        "MAX_ENERGY": 1000,
+        "MAX_PLAYERS": 16,
+        "MAX_TURNS": max_turns(width, height),
+        "MAX_TURN_THRESHOLD": 64,
+        "MIN_CELL_PRODUCTION": 900,
+        "MIN_TURNS": 400,
+        "MIN_TURN_THRESHOLD": 32,
+        "MOVE_COST_RATIO": 10,
+        "NEW_ENTITY_ENERGY_COST": 1000,
+        "PERSISTENCE": 0.7,
+        "SHIPS_ABOVE_FOR_CAPTURE": 3,
+        "STRICT_ERRORS": False,
+    }
+
+
+class CommandError(Exception):
+    """
+    Raised for a command the official engine would reject, which eliminates the bot.
+    """
+    pass
+
+
+class Ship:
+    __slots__ = ('id', 'owner', 'x', 'y', 'halite', 'inspired')
+
+    def __init__(self, ship_id, owner, x, y):
+        self.id = ship_id
+        self.owner = owner
+        self.x = x
+        self.y = y
+        self.halite = 0
+        self.inspired = False
+
+
+class Player:
+    """
+    The engine-side state of one player.
+    """
+    def __init__(self, player_id, shipyard, halite):
+        self.id = player_id
+        self.shipyard = shipyard
+        self.halite = halite
+        self.ships = {}
+        self.dropoffs = {}
+        # Stored halite at the end of every turn, used to break ties
+        self.halite_history = []
+        self.terminated_turn = None
+        self.error = None
+
+    @property
+    def terminated(self):
+        return self.terminated_turn is not None
+
+
+class Match:
+    """
+    One game of Halite III.
+
+    Call frame_lines (or frame_ints) at the start of every turn, gather each player's
+    commands and pass them to process_turn, until is_over.
+    """
+    def __init__(self, num_players, width, height, seed, constants=None):
+        self.width = width
+        self.height = height
+        self.seed = seed
+        self.constants = default_constants(width, height)
+        self.constants.update(constants or {})
+        self.max_turns = self.constants["MAX_TURNS"]
+
+        rows, shipyards = generate_map(width, height, num_players, seed)
+        self.halite = [value for row in rows for value in row]
+        self.initial_rows = rows
+        self.players = [Player(player_id, shipyard, self.constants["INITIAL_ENERGY"])
+                        for player_id, shipyard in enumerate(shipyards)]
+        # Owner of the shipyard or dropoff on every cell that has one, by flat index
+        self.structures = {self._index(*player.shipyard): player.id for player in self.players}
+        self.turn_number = 0
+        # Cells whose halite changed since the last frame, by flat index
+        self.changed_cells = set()
+        self._next_ship_id = 0
+        self._next_dropoff_id = 0
+
+    def _index(self, x, y):
+        return (y % self.height) * self.width + x % self.width
+
+    @property
+    def alive_players(self):
+        return [player for player in self.players if not player.terminated]
+
+    @property
+    def is_over(self):
+        return self.turn_number >= self.max_turns or len(self.alive_players) < 2
+
+    def init_lines(self, player_id):
+        """
+        :param player_id: The player receiving the initial state
+        :return: The lines the engine sends a bot before the game starts
+        """
+        lines = [json.dumps(self.constants), "{} {}".format(len(self.players), player_id)]
+        lines.extend("{} {} {}".format(player.id, *player.shipyard) for player in self.players)
+        lines.append("{} {}".format(self.width, self.height))
+        lines.extend(" ".join(map(str, row)) for row in self.initial_rows)
+        return lines
+
+    def start_turn(self):
+        """
+        Advances to the next turn.
+        :return: The turn number
+        """
+        self.turn_number += 1
+        return self.turn_number
+
+    def frame_ints(self):
+        """
+        :return: The integers of the current turn's frame, in the order the engine sends them
+        """
+        ints = [self.turn_number]
+        for player in self.players:
+            ints.extend((player.id, len(player.ships), len(player.dropoffs), player.halite))
+            for ship in player.ships.values():
+                ints.extend((ship.id, ship.x, ship.y, ship.halite))
+            for dropoff_id, (x, y) in player.dropoffs.items():
+                ints.extend((dropoff_id, x, y))
+        ints.append(len(self.changed_cells))
+        for index in sorted(self.changed_cells):
+            ints.extend((index % self.width, index // self.width, self.halite[index]))
+        return ints
+
+    def frame_lines(self):
+        """
+        :return: The lines of the current turn's frame, identical for every player
+        """
+        lines = [str(self.turn_number)]
+        for player in self.players:
+            lines.append("{} {} {} {}".format(player.id, len(player.ships), len(player.dropoffs), player.halite))
+            lines.extend("{} {} {} {}".format(ship.id, ship.x, ship.y, ship.halite) for ship in player.ships.values())
+            lines.extend("{} {} {}".format(dropoff_id, x, y) for dropoff_id, (x, y) in player.dropoffs.items())
+        lines.append(str(len(self.changed_cells)))
+        lines.extend("{} {} {}".format(index % self.width, index // self.width, self.halite[index])
+                     for index in sorted(self.changed_cells))
+        return lines
+
+    def terminate(self, player, reason):
+        """
+        Eliminates a player (crash, timeout or invalid command); its ships are removed.
+        """
+        if player.terminated:
+            return
+        player.terminated_turn = self.turn_number
+        player.error = reason
+        player.ships.clear()
+
+    def _parse_commands(self, player, commands):
+        """
+        Validates a player's commands the way the official engine does.
+        :return: The ids of ships converting to dropoffs, whether to spawn, and ship id -> move offset
+        """
+        constructs, spawn, moves = [], False, {}
+        seen = set()
+        tokens = " ".join(commands).split()
+        i = 0
+        while i < len(tokens):
+            kind = tokens[i]
+            if kind == 'g':
+                if spawn:
+                    raise CommandError("more than one spawn command")
+                spawn = True
+                i += 1
+                continue
+            try:
+                ship_id = int(tokens[i + 1])
+            except (IndexError, ValueError):
+                raise CommandError("malformed command {!r}".format(" ".join(tokens[i:i + 3])))
+            if ship_id not in player.ships:
+                raise CommandError("ship {} does not belong to player {}".format(ship_id, player.id))
+            if ship_id in seen:
+                raise CommandError("more than one command for ship {}".format(ship_id))
+            seen.add(ship_id)
+            if kind == 'c':
+                constructs.append(ship_id)
+                i += 2
+            elif kind == 'm' and i + 2 < len(tokens) and tokens[i + 2] in DIRECTIONS:
+                moves[ship_id] = DIRECTIONS[tokens[i + 2]]
+                i += 3
+            else:
+                raise CommandError("malformed command {!r}".format(" ".join(tokens[i:i + 3])))
+        return constructs, spawn, moves
+
+    def process_turn(self, commands):
+        """
+        Applies one turn of commands.
+        :param commands: Dict of player id to the list of command strings that player sent
+        :return: nothing.
+        """
+        c = self.constants
+        parsed = {}
+        for player in self.alive_players:
+            try:
+                parsed[player.id] = self._parse_commands(player, commands.get(player.id, []))
+            except CommandError as error:
+                self.terminate(player, str(error))
+
+        # Dropoffs are built first: the ship's cargo and the halite under it count towards the cost
+        for player in self.alive_players:
+            for ship_id in parsed[player.id][0]:
+                ship = player.ships[ship_id]
+                index = self._index(ship.x, ship.y)
+                cost = c["DROPOFF_COST"] - ship.halite - self.halite[index]
+                if index in self.structures:
+                    self.terminate(player, "dropoff built on a structure")
+                elif cost > player.halite:
+                    self.terminate(player, "not enough halite to build a dropoff")
+                else:
+                    player.halite -= cost
+                    self.halite[index] = 0
+                    self.changed_cells.add(index)
+                    del player.ships[ship_id]
+                    player.dropoffs[self._next_dropoff_id] = (ship.x, ship.y)
+                    self._next_dropoff_id += 1
+                    self.structures[index] = player.id
+
+        # Ships that do not move stay to mine; moving costs a share of the halite left behind
+        miners = []
+        for player in self.alive_players:
+            moves = parsed[player.id][2]
+            for ship in player.ships.values():
+                dx, dy = moves.get(ship.id, (0, 0))
+                if (dx, dy) == (0, 0):
+                    miners.append(ship)
+                    continue
+                ratio = c["INSPIRED_MOVE_COST_RATIO"] if ship.inspired else c["MOVE_COST_RATIO"]
+                cost = self.halite[self._index(ship.x, ship.y)] // ratio
+                if cost <= ship.halite:
+                    ship.halite -= cost
+                    ship.x, ship.y = (ship.x + dx) % self.width, (ship.y + dy) % self.height
+
+        for player in self.alive_players:
+            if not parsed[player.id][1]:
+                continue
+            if player.halite < c["NEW_ENTITY_ENERGY_COST"]:
+                self.terminate(player, "not enough halite to spawn a ship")
+                continue
+            player.halite -= c["NEW_ENTITY_ENERGY_COST"]
+            ship = Ship(self._next_ship_id, player.id, *player.shipyard)
+            player.ships[ship.id] = ship
+            self._next_ship_id += 1
+
+        self._resolve_collisions()
+        self._update_inspiration()
+
+        for ship in miners:
+            if ship.id not in self.players[ship.owner].ships:
+                continue
+            index = self._index(ship.x, ship.y)
+            ratio = c["INSPIRED_EXTRACT_RATIO"] if ship.inspired else c["EXTRACT_RATIO"]
+            extracted = min(int(math.ceil(self.halite[index] / ratio)), c["MAX_ENERGY"] - ship.halite)
+            if extracted <= 0:
+                continue
+            self.halite[index] -= extracted
+            self.changed_cells.add(index)
+            ship.halite += extracted
+            if ship.inspired:
+                ship.halite += min(int(extracted * c["INSPIRED_BONUS_MULTIPLIER"]), c["MAX_ENERGY"] - ship.halite)
+
+        for player in self.alive_players:
+            for ship in player.ships.values():
+                if self.structures.get(self._index(ship.x, ship.y)) == player.id:
+                    player.halite += ship.halite
+                    ship.halite = 0
+
+        for player in self.players:
+            player.halite_history.append(player.halite)
+
+    def _resolve_collisions(self):
+        """
+        Sinks every ship sharing a cell with another ship. Their cargo falls into the sea,
+        or goes to the owner of the structure on that cell.
+        """
+        cells = {}
+        for player in self.alive_players:
+            for ship in player.ships.values():
+                cells.setdefault(self._index(ship.x, ship.y), []).append(ship)
+        for index, ships in cells.items():
+            if len(ships) < 2:
+                continue
+            cargo = sum(ship.halite for ship in ships)
+            for ship in ships:
+                del self.players[ship.owner].ships[ship.id]
+            if index in self.structures:
+                self.players[self.structures[index]].halite += cargo
+            elif cargo:
+                self.halite[index] += cargo
+                self.changed_cells.add(index)
+
+    def _update_inspiration(self):
+        """
+        Marks the ships with at least INSPIRATION_SHIP_COUNT opponent ships within INSPIRATION_RADIUS.
+        """
+        ships = [ship for player in self.alive_players for ship in player.ships.values()]
+        if not self.constants["INSPIRATION_ENABLED"] or not ships:
+            for ship in ships:
+                ship.inspired = False
+            return
+        radius, needed = self.constants["INSPIRATION_RADIUS"], self.constants["INSPIRATION_SHIP_COUNT"]
+        if numpy is not None:
+            xs = numpy.array([ship.x for ship in ships])
+            ys = numpy.array([ship.y for ship in ships])
+            owners = numpy.array([ship.owner for ship in ships])
+            dx = numpy.abs(xs[:, None] - xs[None, :])
+            dy = numpy.abs(ys[:, None] - ys[None, :])
+            distance = numpy.minimum(dx, self.width - dx) + numpy.minimum(dy, self.height - dy)
+            counts = ((distance <= radius) & (owners[:, None] != owners[None, :])).sum(axis=1)
+            for ship, count in zip(ships, counts.tolist()):
+                ship.inspired = count >= needed
+            return
+        for ship in ships:
+            count = 0
+            for other in ships:
+                if other.owner == ship.owner:
+                    continue
+                dx, dy = abs(ship.x - other.x), abs(ship.y - other.y)
+                if min(dx, self.width - dx) + min(dy, self.height - dy) <= radius:
+                    count += 1
+            ship.inspired = count >= needed
+
+    def rankings(self):
+        """
+        Ranks players: surviving players by stored halite (ties broken by the previous turns,
+        latest first), then eliminated players, the last to go first.
+        :return: The players, best first
+        """
+        def key(player):
+            if player.terminated:
+                return (0, player.terminated_turn, player.halite)
+            return (1, list(reversed(player.halite_history)), player.halite)
+        return sorted(self.players, key=key, reverse=True)
+
+    def results(self):
+        """
+        :return: The game results in the shape of the official engine's --results-as-json output
+        """
+        ranks = {player.id: rank for rank, player in enumerate(self.rankings(), 1)}
+        return {
+            "map_width": self.width,
+            "map_height": self.height,
+            "map_seed": self.seed,
+            "turns": self.turn_number,
+            "stats": {str(player.id): {"rank": ranks[player.id], "score": player.halite}
+                      for player in self.players},
+            "terminated": {str(player.id): player.terminated for player in self.players},
+            "error_logs": {str(player.id): player.error for player in self.players if player.error},
+        }
@@ -0,0 +1,195 @@
+"""
+Plays a Match between bots loaded into this process, without subprocesses or text I/O.
+
+A bot script is loadable when it defines setup(game), which runs the pre-game processing
+and calls game.ready(name), and turn(game), which returns the turn's commands once
+game.update_frame() has run. Its script loop must then be guarded by
+if __name__ == "__main__", as in MyBot.py. Each game loads a fresh copy of every bot
+module, so module-level state does not leak from one game into the next.
+"""
+import ast
+import importlib.util
+import itertools
+import os
+import random
+import shlex
+import sys
+import time
+
+import hlt
+
+from .engine import Match
+
+_module_ids = itertools.count()
+
+
+class InProcessConnection:
+    """
+    Stands in for stdin/stdout between a hlt.Game and a Match: the initial lines are read
+    as text, after which frames are handed over as the integers the engine would print and
+    commands come back as the list the bot built.
+    """
+    def __init__(self, init_lines):
+        self._lines = list(init_lines)
+        self._line = 0
+        self._ints = []
+        self._position = 0
+        self._sent = []
+        self._arrival = time.perf_counter()
+
+    def readline(self):
+        """
+        :return: The next initial line, without its line break
+        """
+        if self._line >= len(self._lines):
+            raise EOFError("EOF when reading from the engine")
+        self._line += 1
+        return self._lines[self._line - 1]
+
+    def feed(self, ints):
+        """
+        Hands over the integers of a new frame.
+        :param ints: The frame, as returned by Match.frame_ints
+        :return: nothing.
+        """
+        self._ints = ints
+        self._position = 0
+        self._arrival = time.perf_counter()
+
+    def read_ints(self, count):
+        """
+        :param count: How many integers to read
+        :return: The next count integers of the frame
+        """
+        ints = self._ints[self._position:self._position + count]
+        if len(ints) < count:
+            raise EOFError("EOF when reading from the engine")
+        self._position += count
+        return ints
+
+    def arrival(self):
+        """
+        :return: The time.perf_counter() value at which the last frame was handed over
+        """
+        return self._arrival
+
+    def send(self, commands):
+        self._sent.append(commands)
+
+    def receive(self):
+        """
+        :return: The oldest list of commands sent by the bot and not yet received, or None
+        """
+        return self._sent.pop(0) if self._sent else None
+
+
+def is_loadable(path):
+    """
+    :param path: A bot script, or a command line running it such as "python3 MyBot.py"
+    :return: Whether the script defines the setup(game) and turn(game) entry points
+    """
+    path = os.path.abspath(bot_path(path))
+    with open(path) as source:
+        defined = {node.name for node in ast.parse(source.read(), path).body if isinstance(node, ast.FunctionDef)}
+    return {"setup", "turn"} <= defined
+
+
+def load_bot(path):
+    """
+    Loads a fresh copy of a bot script as a module.
+    :param path: The bot script, or a command line running it such as "python3 MyBot.py"
+    :return: The bot module
+    """
+    path = os.path.abspath(bot_path(path))
+    # Scripts without the entry points would play over stdin as soon as they are imported
+    if not is_loadable(path):
+        raise ValueError("{} defines no setup(game) and turn(game) entry points".format(path))
+    # Bots import hlt and their helpers from their own directory
+    directory = os.path.dirname(path)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    name = "_arena_bot_{}_{}".format(os.path.splitext(os.path.basename(path))[0], next(_module_ids))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bot_path(command):
+    """
+    :param command: A bot script, or a command line running one such as "python3 MyBot.py"
+    :return: The path of the script
+    """
+    arguments = shlex.split(command)
+    scripts = [argument for argument in arguments if argument.endswith(".py")]
+    return scripts[-1] if scripts else arguments[-1]
+
+
+class InProcessBot:
+    """
+    A bot module playing one game through its own hlt.Game.
+    """
+    def __init__(self, path, init_lines):
+        self.connection = InProcessConnection(init_lines)
+        self.module = load_bot(path)
+        self.game = hlt.Game(self.connection)
+        self.module.setup(self.game)
+        ready = self.connection.receive()
+        if not ready:
+            raise ValueError("{} did not call game.ready".format(path))
+        self.name = ready[0]
+        # Seconds spent in the bot's turns so far
+        self.think_time = 0.0
+
+    def play_turn(self, frame):
+        """
+        :param frame: The integers of the turn's frame, as returned by Match.frame_ints
+        :return: The bot's commands for the turn
+        """
+        start = time.perf_counter()
+        self.connection.feed(frame)
+        self.game.update_frame()
+        commands = self.module.turn(self.game)
+        self.think_time += time.perf_counter() - start
+        return commands
+
+
+def run_game(paths, width, height, seed, turn_limit=None):
+    """
+    Plays one game between bot scripts loaded into this process.
+    Turns are not timed out: a bot cannot be interrupted within the process, which is
+    why the time each bot took is reported instead.
+    :param paths: One bot script (or command line running it) per player
+    :param width: The map width
+    :param height: The map height
+    :param seed: The map seed, also used to seed the random module the bots share
+    :param turn_limit: Stop after this many turns instead of the map's MAX_TURNS
+    :return: The results dict (see Match.results), with the bot names and think times added
+    """
+    match = Match(len(paths), width, height, seed)
+    if turn_limit is not None:
+        match.max_turns = min(match.max_turns, turn_limit)
+    random.seed(seed)
+    bots = {}
+    for player, path in zip(match.players, paths):
+        try:
+            bots[player.id] = InProcessBot(path, match.init_lines(player.id))
+        except Exception as error:
+            match.terminate(player, "initialization: {!r}".format(error))
+
+    while not match.is_over:
+        match.start_turn()
+        frame = match.frame_ints()
+        commands_by_player = {}
+        for player in match.alive_players:
+            try:
+                commands_by_player[player.id] = bots[player.id].play_turn(frame)
+            except Exception as error:
+                match.terminate(player, "turn {}: {!r}".format(match.turn_number, error))
+        match.changed_cells.clear()
+        match.process_turn(commands_by_player)
+
+    results = match.results()
+    results["names"] = {str(player_id): bot.name for player_id, bot in bots.items()}
+    results["think_time"] = {str(player_id): bot.think_time for player_id, bot in bots.items()}
+    return results
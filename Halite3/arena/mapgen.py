@@ -0,0 +1,101 @@
+"""
+Seeded, symmetric halite map generation.
+
+Maps are built from fractal value noise over one tile (half of the map for two
+players, a quarter for four), which is then mirrored so every player starts
+from an identical position.
+"""
+import random
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""The map sizes played in the competition."""
+MAP_SIZES = (32, 40, 48, 56, 64)
+
+# Shape of the noise: number of octaves, and how much each octave keeps of the previous one
+OCTAVES = 5
+PERSISTENCE = 0.55
+# Richness of the map: mean halite per cell, and the largest amount on a single cell
+MEAN_HALITE = 180
+MAX_CELL_HALITE = 1000
+
+
+def _noise_tile(width, height, rng):
+    """
+    Sums octaves of bilinearly interpolated random lattices.
+    :return: A height x width list of rows of floats in [0, 1]
+    """
+    tile = [[0.0] * width for _ in range(height)]
+    amplitude, total = 1.0, 0.0
+    for octave in range(OCTAVES):
+        step = max(1, max(width, height) >> (octave + 1))
+        lattice_w, lattice_h = width // step + 2, height // step + 2
+        lattice = [[rng.random() for _ in range(lattice_w)] for _ in range(lattice_h)]
+        for y in range(height):
+            gy, fy = divmod(y / step, 1)
+            gy = int(gy)
+            for x in range(width):
+                gx, fx = divmod(x / step, 1)
+                gx = int(gx)
+                top = lattice[gy][gx] * (1 - fx) + lattice[gy][gx + 1] * fx
+                bottom = lattice[gy + 1][gx] * (1 - fx) + lattice[gy + 1][gx + 1] * fx
+                tile[y][x] += amplitude * (top * (1 - fy) + bottom * fy)
+        total += amplitude
+        amplitude *= PERSISTENCE
+    return [[value / total for value in row] for row in tile]
+
+
+def _scale(tile, rng):
+    """
+    Turns noise into halite amounts: sharpens the noise into rich patches, then scales it
+    to the target mean without letting a cell exceed MAX_CELL_HALITE.
+    """
+    exponent = rng.uniform(3.0, 5.0)
+    if numpy is not None:
+        values = numpy.asarray(tile) ** exponent
+        values *= MEAN_HALITE / max(values.mean(), 1e-9)
+        return numpy.minimum(values, MAX_CELL_HALITE).astype(int).tolist()
+    values = [[value ** exponent for value in row] for row in tile]
+    mean = sum(map(sum, values)) / (len(values) * len(values[0]))
+    factor = MEAN_HALITE / max(mean, 1e-9)
+    return [[min(int(value * factor), MAX_CELL_HALITE) for value in row] for row in values]
+
+
+def shipyard_positions(width, height, num_players):
+    """
+    :return: The (x, y) shipyard position of every player, in player id order
+    """
+    left = (width // 4, height // 2)
+    if num_players == 2:
+        return [left, (width - 1 - left[0], left[1])]
+    if num_players == 4:
+        x, y = width // 4, height // 4
+        return [(x, y), (width - 1 - x, y), (x, height - 1 - y), (width - 1 - x, height - 1 - y)]
+    raise ValueError("Halite is played by 2 or 4 players, not {}".format(num_players))
+
+
+def generate_map(width, height, num_players, seed):
+    """
+    Generates a symmetric map.
+    :param width: The map width
+    :param height: The map height
+    :param num_players: 2 or 4
+    :param seed: The map seed; the same seed always gives the same map
+    :return: The halite rows (a height x width list of lists) and the shipyard positions
+    """
+    rng = random.Random(seed)
+    # Odd sizes mirror around a centre column (and row), which the tile holds once
+    tile_w = (width + 1) // 2
+    tile_h = (height + 1) // 2 if num_players == 4 else height
+    tile = _scale(_noise_tile(tile_w, tile_h, rng), rng)
+
+    rows = [row + row[::-1][width % 2:] for row in tile]
+    if num_players == 4:
+        rows = rows + rows[::-1][height % 2:]
+    shipyards = shipyard_positions(width, height, num_players)
+    for x, y in shipyards:
+        rows[y][x] = 0
+    return rows, shipyards
@@ -0,0 +1,158 @@
+"""
+Plays a Match between bots running as subprocesses, over the engine's stdin/stdout protocol.
+"""
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+
+from .engine import Match
+
+"""Seconds a bot may take to send its name after receiving the initial state."""
+INIT_TIMEOUT = 30.0
+
+"""Seconds a bot may take to answer a frame."""
+TURN_TIMEOUT = 2.0
+
+
+class BotError(Exception):
+    """
+    Raised when a bot crashes, closes its output or runs out of time.
+    """
+    pass
+
+
+class SubprocessBot:
+    """
+    A bot process. Lines are read from its stdout on a background thread so that
+    answers can be awaited with a timeout.
+    """
+    def __init__(self, command, cwd=None, log_file=None):
+        self.command = command
+        self.process = subprocess.Popen(shlex.split(command), cwd=cwd, stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, stderr=log_file or subprocess.DEVNULL,
+                                        universal_newlines=True, bufsize=1)
+        self._lines = queue.Queue()
+        self._reader = threading.Thread(target=self._read_lines, daemon=True)
+        self._reader.start()
+
+    def _read_lines(self):
+        for line in self.process.stdout:
+            self._lines.put(line.rstrip("\n"))
+        self._lines.put(None)
+
+    def send(self, lines):
+        """
+        Sends lines to the bot.
+        :param lines: The lines to send, without line breaks
+        :return: nothing.
+        """
+        try:
+            self.process.stdin.write("\n".join(lines) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            raise BotError("bot closed its input")
+
+    def receive(self, deadline):
+        """
+        Waits for the bot's next line.
+        :param deadline: time.monotonic() value by which the line must arrive, or None to wait forever
+        :return: The line, without its line break
+        """
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            line = self._lines.get(timeout=timeout)
+        except queue.Empty:
+            raise BotError("timed out")
+        if line is None:
+            raise BotError("bot exited with code {}".format(self.process.poll()))
+        return line
+
+    def kill(self, grace=1.0):
+        """
+        Stops the bot process, first closing its input and giving it grace seconds to exit by itself.
+        """
+        try:
+            self.process.stdin.close()
+            self.process.wait(grace)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+        self.process.wait()
+
+
+def resolve_command(command, directory):
+    """
+    :param command: A bot command line, e.g. "python3 MyBot.py"
+    :param directory: The directory the command's scripts are relative to
+    :return: The command line with absolute script paths, so that it runs from any directory
+    """
+    return " ".join(shlex.quote(os.path.join(directory, argument) if argument.endswith(".py") else argument)
+                    for argument in shlex.split(command))
+
+
+def run_game(commands, width, height, seed, turn_timeout=TURN_TIMEOUT, init_timeout=INIT_TIMEOUT,
+             turn_limit=None, cwd=None):
+    """
+    Plays one game between bot commands.
+    :param commands: One shell-style command line per player, e.g. "python3 MyBot.py"
+    :param width: The map width
+    :param height: The map height
+    :param seed: The map seed
+    :param turn_timeout: Seconds per turn, or None for no limit
+    :param init_timeout: Seconds for start-up, or None for no limit
+    :param turn_limit: Stop after this many turns instead of the map's MAX_TURNS
+    :param cwd: Working directory of the bots
+    :return: The results dict (see Match.results), with the bot names added
+    """
+    match = Match(len(commands), width, height, seed)
+    if turn_limit is not None:
+        match.max_turns = min(match.max_turns, turn_limit)
+    bots = [SubprocessBot(command, cwd=cwd) for command in commands]
+    names = {}
+
+    def deadline(timeout):
+        return None if timeout is None else time.monotonic() + timeout
+
+    try:
+        for player, bot in zip(match.players, bots):
+            try:
+                bot.send(match.init_lines(player.id))
+            except BotError as error:
+                match.terminate(player, str(error))
+        init_deadline = deadline(init_timeout)
+        for player, bot in zip(match.players, bots):
+            if not player.terminated:
+                try:
+                    names[player.id] = bot.receive(init_deadline)
+                except BotError as error:
+                    match.terminate(player, "initialization: {}".format(error))
+
+        while not match.is_over:
+            match.start_turn()
+            frame = match.frame_lines()
+            players = match.alive_players
+            for player in players:
+                try:
+                    bots[player.id].send(frame)
+                except BotError as error:
+                    match.terminate(player, str(error))
+            turn_deadline = deadline(turn_timeout)
+            commands_by_player = {}
+            for player in players:
+                if player.terminated:
+                    continue
+                try:
+                    commands_by_player[player.id] = [bots[player.id].receive(turn_deadline)]
+                except BotError as error:
+                    match.terminate(player, "turn {}: {}".format(match.turn_number, error))
+            match.changed_cells.clear()
+            match.process_turn(commands_by_player)
+    finally:
+        for bot in bots:
+            bot.kill()
+
+    results = match.results()
+    results["names"] = {str(player_id): name for player_id, name in names.items()}
+    return results
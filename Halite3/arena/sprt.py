@@ -0,0 +1,248 @@
+"""
+Head-to-head A/B test of a candidate bot against a baseline, stopped as soon as a sequential
+probability ratio test (SPRT) decides between "the candidate is no better" (H0) and "the
+candidate is better by elo1" (H1), e.g.
+
+    python3 -m arena.sprt "python3 SlayerBotNew.py" "python3 SlayerBot.py" --elo1 30
+
+Games are played in pairs on the same map seed with the player slots swapped, so that an
+advantage of one side of the map cancels out within the pair. Pairs are scored as a whole
+(0, 1/2 or 1 for the candidate) and the log-likelihood ratio uses the normal approximation
+of the generalized SPRT, which accounts for the correlation between the two games of a pair.
+"""
+import argparse
+import concurrent.futures
+import itertools
+import json
+import math
+import random
+
+from .mapgen import MAP_SIZES
+from .tournament import GAME_TIMEOUT, bot_label, play_game
+
+"""Pairs played before the test may stop, so that the variance estimate means something."""
+MIN_PAIRS = 8
+
+
+def expected_score(elo):
+    """
+    :param elo: An Elo difference
+    :return: The expected score of the stronger side
+    """
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(score):
+    """
+    :param score: An expected score, strictly between 0 and 1
+    :return: The Elo difference giving that score
+    """
+    # Adding 0.0 turns a -0.0 for even scores into 0.0
+    return -400 * math.log10(1 / score - 1) + 0.0
+
+
+def log_likelihood_ratio(pair_scores, elo0, elo1):
+    """
+    The generalized SPRT log-likelihood ratio of H1 (Elo difference elo1) against H0 (elo0),
+    from the normal approximation of the mean pair score.
+    :param pair_scores: The candidate's score in every pair played
+    :return: The log-likelihood ratio, 0 while the variance is unknown
+    """
+    count = len(pair_scores)
+    if count < 2:
+        return 0.0
+    mean = sum(pair_scores) / count
+    variance = sum((score - mean) ** 2 for score in pair_scores) / count
+    if variance == 0:
+        # Every pair ended alike; credit a fraction of a split pair so the ratio stays finite
+        variance = 0.25 / count
+    score0, score1 = expected_score(elo0), expected_score(elo1)
+    return count * (score1 - score0) * (2 * mean - score0 - score1) / (2 * variance)
+
+
+def wilson_interval(successes, trials, z=1.96):
+    """
+    :return: The Wilson score interval of a success rate, as (low, high)
+    """
+    if not trials:
+        return 0.0, 1.0
+    rate = successes / trials
+    centre = rate + z * z / (2 * trials)
+    spread = z * math.sqrt(rate * (1 - rate) / trials + z * z / (4 * trials * trials))
+    scale = 1 + z * z / trials
+    return (centre - spread) / scale, (centre + spread) / scale
+
+
+def mean_interval(values, z=1.96):
+    """
+    :return: The mean of values and its normal-approximation interval, as (mean, low, high)
+    """
+    if not values:
+        return 0.0, 0.0, 0.0
+    mean = sum(values) / len(values)
+    if len(values) < 2:
+        return mean, mean, mean
+    error = math.sqrt(sum((value - mean) ** 2 for value in values) / (len(values) - 1) / len(values))
+    return mean, mean - z * error, mean + z * error
+
+
+class SPRT:
+    """
+    Running state of a test: the finished pairs, and the decision once the
+    log-likelihood ratio leaves the bounds set by the error rates alpha and beta.
+    """
+    def __init__(self, elo0=0.0, elo1=30.0, alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower = math.log(beta / (1 - alpha))
+        self.upper = math.log((1 - beta) / alpha)
+        self.pairs = []
+
+    def add_pair(self, games):
+        """
+        Records a finished pair of games.
+        :param games: The two games' (candidate rank, candidate score, baseline score)
+        :return: nothing.
+        """
+        self.pairs.append(games)
+
+    @property
+    def games(self):
+        return [game for pair in self.pairs for game in pair]
+
+    @property
+    def pair_scores(self):
+        return [sum(1.0 if rank == 1 else 0.0 for rank, _, _ in pair) / 2 for pair in self.pairs]
+
+    @property
+    def llr(self):
+        return log_likelihood_ratio(self.pair_scores, self.elo0, self.elo1)
+
+    @property
+    def decision(self):
+        """
+        :return: "H1" if the candidate is better, "H0" if it is not, or None while undecided
+        """
+        if len(self.pairs) < MIN_PAIRS:
+            return None
+        if self.llr >= self.upper:
+            return "H1"
+        if self.llr <= self.lower:
+            return "H0"
+        return None
+
+    def summary(self, candidate="candidate", baseline="baseline"):
+        """
+        :return: Lines describing the test so far
+        """
+        games = self.games
+        wins = sum(1 for rank, _, _ in games if rank == 1)
+        low, high = wilson_interval(wins, len(games))
+        difference, difference_low, difference_high = mean_interval(
+            [candidate_score - baseline_score for _, candidate_score, baseline_score in games])
+        rate = min(max(wins / len(games), 1e-3), 1 - 1e-3) if games else 0.5
+        verdict = {"H1": "{} is stronger (H1 accepted)".format(candidate),
+                   "H0": "{} is not stronger (H0 accepted)".format(candidate),
+                   None: "undecided"}[self.decision]
+        return [
+            "{} vs {}: {} games ({} pairs)".format(candidate, baseline, len(games), len(self.pairs)),
+            "win rate {:.1%} [{:.1%}, {:.1%}], about {:+.0f} Elo".format(
+                wins / len(games) if games else 0, low, high, elo_difference(rate)),
+            "score difference {:+.0f} [{:+.0f}, {:+.0f}]".format(difference, difference_low, difference_high),
+            "LLR {:.2f} in ({:.2f}, {:.2f}) for elo0={:g}, elo1={:g}: {}".format(
+                self.llr, self.lower, self.upper, self.elo0, self.elo1, verdict),
+        ]
+
+
+def _play_slot(pair, swapped, commands, engine, in_process, timeout, turn_limit):
+    """
+    Plays one game of a pair in a worker process.
+    :return: The pair number, swapped, and (candidate rank, candidate score, baseline score), or an error message
+    """
+    lineup = list(reversed(commands)) if swapped else list(commands)
+    try:
+        results = play_game(lineup, pair["size"], pair["size"], pair["seed"], engine, in_process, timeout,
+                            turn_limit)
+    except Exception as error:
+        return pair["pair"], swapped, "{!r}".format(error)
+    candidate, baseline = ("1", "0") if swapped else ("0", "1")
+    stats = results["stats"]
+    return pair["pair"], swapped, (stats[candidate]["rank"], stats[candidate]["score"], stats[baseline]["score"])
+
+
+def run_sprt(candidate, baseline, test, max_games=2000, sizes=MAP_SIZES, seed=0, workers=None, engine=None,
+             in_process=False, timeout=GAME_TIMEOUT, turn_limit=None, output=None, log=print):
+    """
+    Plays pairs of games in parallel until the test decides or max_games is reached.
+    Games still queued when the test stops are cancelled; games already running are ignored.
+    :param candidate: The candidate bot's command line
+    :param baseline: The baseline bot's command line
+    :param test: The SPRT to feed
+    :param output: Optional file to append every finished pair to, as JSON lines
+    :return: The test
+    """
+    rng = random.Random(seed)
+    map_sizes = itertools.cycle(sizes)
+    pairs = [{"pair": number, "size": next(map_sizes), "seed": rng.randrange(1 << 31)}
+             for number in range(max_games // 2)]
+    commands = (candidate, baseline)
+    finished = {}
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_play_slot, pair, swapped, commands, engine, in_process, timeout, turn_limit)
+                   for pair in pairs for swapped in (False, True)]
+        for future in concurrent.futures.as_completed(futures):
+            if future.cancelled():
+                continue
+            number, swapped, game = future.result()
+            finished.setdefault(number, {})[swapped] = game
+            if len(finished[number]) < 2:
+                continue
+            games = [finished[number][False], finished[number][True]]
+            errors = [game for game in games if isinstance(game, str)]
+            if errors:
+                log("pair {} dropped: {}".format(number, errors[0]))
+                continue
+            test.add_pair(games)
+            if output:
+                with open(output, "a") as results:
+                    results.write(json.dumps(dict(pairs[number], games=games)) + "\n")
+            log("pair {}: candidate ranks {}, LLR {:.2f}".format(number, [rank for rank, _, _ in games], test.llr))
+            if test.decision is not None:
+                for pending in futures:
+                    pending.cancel()
+                break
+    return test
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python3 -m arena.sprt",
+                                     description="Test whether a candidate bot beats a baseline, stopping early.")
+    parser.add_argument("candidate", help="command line of the candidate bot")
+    parser.add_argument("baseline", help="command line of the baseline bot")
+    parser.add_argument("--elo0", type=float, default=0.0, help="Elo difference under H0 (default: 0)")
+    parser.add_argument("--elo1", type=float, default=30.0, help="Elo difference under H1 (default: 30)")
+    parser.add_argument("--alpha", type=float, default=0.05, help="false positive rate")
+    parser.add_argument("--beta", type=float, default=0.05, help="false negative rate")
+    parser.add_argument("-n", "--max-games", type=int, default=2000, help="stop undecided after this many games")
+    parser.add_argument("--sizes", type=int, nargs="+", default=MAP_SIZES, help="map sizes to play on")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the map seeds")
+    parser.add_argument("-j", "--workers", type=int, help="games played at once (default: one per core)")
+    parser.add_argument("--engine", help="engine command line (default: ./halite on macOS, else python3 -m arena)")
+    parser.add_argument("--in-process", action="store_true", help="load the bots into the worker processes")
+    parser.add_argument("--game-timeout", type=float, default=GAME_TIMEOUT, help="seconds before a game is abandoned")
+    parser.add_argument("--turn-limit", type=int, help="stop games after this many turns")
+    parser.add_argument("-o", "--output", help="file to append the finished pairs to")
+    args = parser.parse_args(argv)
+
+    test = SPRT(args.elo0, args.elo1, args.alpha, args.beta)
+    run_sprt(args.candidate, args.baseline, test, args.max_games, args.sizes, args.seed, args.workers, args.engine,
+             args.in_process, args.game_timeout, args.turn_limit, args.output)
+    candidate, baseline = bot_label(args.candidate), bot_label(args.baseline)
+    if candidate == baseline:
+        candidate, baseline = args.candidate, args.baseline
+    print("\n".join(test.summary(candidate, baseline)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,401 @@
+"""
+Round-robin tournament between bots, played in parallel over seeded 2- and 4-player
+games on every map size, with Elo ratings and their confidence intervals, e.g.
+
+    python3 -m arena.tournament --games 200 "python3 MyBotV6.py" "python3 SlayerBot.py" "python3 MyBot.py"
+
+Each game is written to the output file (JSON lines) as soon as it finishes, and games
+already in that file are not played again, so an interrupted tournament resumes where it
+stopped. Any engine accepting the halite CLI flags can play the games (--engine); the
+default is this package's engine. TrueSkill ratings are added when the trueskill package
+is installed.
+"""
+import argparse
+import concurrent.futures
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import shlex
+import signal
+import subprocess
+import sys
+import tempfile
+
+try:
+    import trueskill
+except ImportError:
+    trueskill = None
+
+from .mapgen import MAP_SIZES
+from .runner import resolve_command
+
+"""Directory the bots and the engine run from: the one holding hlt/ and arena/."""
+BOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+"""Bots played when none are given; in-process, only those with setup/turn entry points are played."""
+DEFAULT_BOTS = ["python3 MyBot.py", "python3 MyBotV1.py", "python3 MyBotV5.py",
+                "python3 MyBotV6.py", "python3 SlayerBot.py", "python3 UtilityBot.py"]
+
+"""Seconds after which a whole game is abandoned."""
+GAME_TIMEOUT = 900
+
+
+def default_engine():
+    """
+    :return: The command running the bundled halite executable where it runs, otherwise this package's engine
+    """
+    if platform.system() == "Darwin" and os.path.exists(os.path.join(BOT_DIRECTORY, "halite")):
+        return shlex.quote(os.path.join(BOT_DIRECTORY, "halite"))
+    return "{} -m arena".format(shlex.quote(sys.executable))
+
+
+def bot_label(command):
+    """
+    :param command: A bot command line, e.g. "python3 MyBotV6.py"
+    :return: A short name for the bot, e.g. "MyBotV6"
+    """
+    scripts = [argument for argument in shlex.split(command) if argument.endswith(".py")]
+    return os.path.splitext(os.path.basename(scripts[-1]))[0] if scripts else command
+
+
+def schedule(num_bots, games, sizes=MAP_SIZES, four_player_share=0.5, seed=0):
+    """
+    Plans the games of a tournament: 2-player games cycle through every ordered pair of bots,
+    so each bot plays every other from both slots, 4-player games cycle through every set of
+    four bots in a random seating, and map sizes are cycled through as well.
+    :param num_bots: How many bots take part
+    :param games: How many games to plan
+    :param sizes: The map sizes to play on
+    :param four_player_share: Rough share of 4-player games, when there are at least 4 bots
+    :param seed: Seed of the plan; the same arguments always give the same games
+    :return: A list of games, each a dict with the game number, map size, map seed and the bots' indices by slot
+    """
+    rng = random.Random(seed)
+    pairs = list(itertools.permutations(range(num_bots), 2))
+    quads = list(itertools.combinations(range(num_bots), 4))
+    rng.shuffle(pairs)
+    rng.shuffle(quads)
+    pairs, quads, map_sizes = itertools.cycle(pairs), itertools.cycle(quads), itertools.cycle(sizes)
+
+    plan = []
+    for game in range(games):
+        if num_bots >= 4 and rng.random() < four_player_share:
+            lineup = list(next(quads))
+            rng.shuffle(lineup)
+        else:
+            lineup = list(next(pairs))
+        plan.append({"game": game, "size": next(map_sizes), "seed": rng.randrange(1 << 31), "lineup": lineup})
+    return plan
+
+
+class GameTimeout(BaseException):
+    """
+    Raised inside an in-process game when its time runs out. Like KeyboardInterrupt, it is not
+    an Exception, so that it is not taken for a bot crashing.
+    """
+    pass
+
+
+def _run_in_process(paths, width, height, seed, timeout, turn_limit):
+    """
+    Plays a game in this process under a SIGALRM timer, where the system has one.
+    :return: The results dict (see Match.results)
+    """
+    from . import inprocess
+    if timeout is None or not hasattr(signal, "setitimer"):
+        return inprocess.run_game(paths, width, height, seed, turn_limit)
+
+    def expire(signum, frame):
+        raise GameTimeout()
+
+    previous = signal.signal(signal.SIGALRM, expire)
+    try:
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return inprocess.run_game(paths, width, height, seed, turn_limit)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except GameTimeout:
+        raise subprocess.TimeoutExpired("in-process game", timeout)
+    finally:
+        signal.signal(signal.SIGALRM, previous)
+
+
+def play_game(commands, width, height, seed, engine=None, in_process=False, timeout=GAME_TIMEOUT, turn_limit=None,
+              cwd=BOT_DIRECTORY, log_directory=None):
+    """
+    Plays one game through an engine command line, or in-process.
+    :param commands: One bot command line per player
+    :param width: The map width
+    :param height: The map height
+    :param seed: The map seed
+    :param engine: The engine command line (default: default_engine())
+    :param in_process: Load the bots into this process with arena.inprocess instead
+    :param timeout: Seconds after which the game is abandoned, killing the engine and its bots
+    :param turn_limit: Stop after this many turns instead of the map's MAX_TURNS
+    :param cwd: Directory the bot scripts (and the arena package) are found in
+    :param log_directory: Directory the engine and bots run from, keeping the bots' log files;
+        a temporary directory discarded after the game if None
+    :return: The engine's results dict (see Match.results)
+    """
+    if in_process:
+        from . import inprocess
+        return _run_in_process([os.path.join(cwd, inprocess.bot_path(command)) for command in commands],
+                               width, height, seed, timeout, turn_limit)
+
+    arguments = shlex.split(engine or default_engine()) + [
+        "--results-as-json", "--no-replay",
+        "--width", str(width), "--height", str(height), "--seed", str(seed)]
+    if log_directory is None:
+        arguments.append("--no-logs")
+    if turn_limit is not None:
+        arguments += ["--turn-limit", str(turn_limit)]
+    arguments += [resolve_command(command, cwd) for command in commands]
+    # Games run from a directory of their own, so that games played at once do not write over each
+    # other's bot logs, nor over those in the bots' directory
+    environment = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [cwd, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory() as scratch:
+        if log_directory is not None:
+            os.makedirs(log_directory, exist_ok=True)
+        # A session of its own lets a stuck game be killed along with its bots
+        process = subprocess.Popen(arguments, cwd=log_directory or scratch, env=environment,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                   universal_newlines=True, start_new_session=True)
+        try:
+            output, _ = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+            process.communicate()
+            raise
+    # The engine may print other lines before its results
+    return json.loads(output[output.index("{"):])
+
+
+def _play(game, commands, engine, in_process, timeout, turn_limit, log_directory):
+    """
+    Plays a scheduled game in a worker process.
+    :return: The game's record, with an error instead of results if the game could not be played
+    """
+    lineup = [commands[bot] for bot in game["lineup"]]
+    record = dict(game)
+    if log_directory is not None:
+        log_directory = os.path.join(log_directory, "game-{}".format(game["game"]))
+    try:
+        results = play_game(lineup, game["size"], game["size"], game["seed"], engine, in_process, timeout,
+                            turn_limit, log_directory=log_directory)
+    except subprocess.TimeoutExpired:
+        record["error"] = "game timed out after {} s".format(timeout)
+        return record
+    except (OSError, ValueError) as error:
+        record["error"] = "engine failed: {!r}".format(error)
+        return record
+    record["ranks"] = [results["stats"][str(slot)]["rank"] for slot in range(len(lineup))]
+    record["scores"] = [results["stats"][str(slot)]["score"] for slot in range(len(lineup))]
+    error_logs = results.get("error_logs", {})
+    record["errors"] = {str(slot): error_logs[str(slot)] for slot in range(len(lineup)) if str(slot) in error_logs}
+    return record
+
+
+def pairwise_results(records):
+    """
+    Splits games into pairwise wins: in a 4-player game, each player beats every player it outranks.
+    :param records: Game records with bots (labels by slot) and ranks
+    :return: A list of (winner, loser) labels
+    """
+    duels = []
+    for record in records:
+        for first, second in itertools.combinations(range(len(record["bots"])), 2):
+            if record["bots"][first] == record["bots"][second]:
+                continue
+            if record["ranks"][first] < record["ranks"][second]:
+                duels.append((record["bots"][first], record["bots"][second]))
+            else:
+                duels.append((record["bots"][second], record["bots"][first]))
+    return duels
+
+
+def bradley_terry(duels, bots, iterations=200, prior=1.0):
+    """
+    Fits Bradley-Terry strengths to pairwise wins with the MM algorithm, as Elo ratings.
+    Every bot is credited half a win and half a loss against every other bot (prior), which
+    keeps the ratings of bots that never lost or never won finite.
+    :param duels: A list of (winner, loser) labels
+    :param bots: All the labels to rate
+    :param iterations: Number of MM updates
+    :param prior: Virtual games between every pair of bots
+    :return: A dict of Elo ratings averaging 1500
+    """
+    wins = {bot: prior * (len(bots) - 1) / 2 for bot in bots}
+    games = {pair: prior for pair in itertools.combinations(sorted(bots), 2)}
+    for winner, loser in duels:
+        wins[winner] += 1
+        games[tuple(sorted((winner, loser)))] += 1
+    opponents = {bot: [] for bot in bots}
+    for (first, second), count in games.items():
+        opponents[first].append((second, count))
+        opponents[second].append((first, count))
+
+    strength = {bot: 1.0 for bot in bots}
+    for _ in range(iterations):
+        strength = {bot: wins[bot] / sum(count / (strength[bot] + strength[other])
+                                         for other, count in opponents[bot]) if opponents[bot] else 1.0
+                    for bot in bots}
+        scale = math.exp(sum(math.log(value) for value in strength.values()) / len(strength))
+        strength = {bot: value / scale for bot, value in strength.items()}
+    return {bot: 1500 + 400 * math.log10(value) for bot, value in strength.items()}
+
+
+def elo_intervals(records, bots, samples=200, confidence=0.95, seed=0):
+    """
+    Bootstraps confidence intervals of the Elo ratings by refitting on games resampled with replacement.
+    :return: A dict of (low, high) rating bounds
+    """
+    rng = random.Random(seed)
+    fits = {bot: [] for bot in bots}
+    for _ in range(samples):
+        resampled = [rng.choice(records) for _ in records]
+        for bot, rating in bradley_terry(pairwise_results(resampled), bots).items():
+            fits[bot].append(rating)
+    tail = (1 - confidence) / 2
+    intervals = {}
+    for bot, ratings in fits.items():
+        ratings.sort()
+        intervals[bot] = (ratings[int(tail * (len(ratings) - 1))], ratings[int((1 - tail) * (len(ratings) - 1))])
+    return intervals
+
+
+def trueskill_ratings(records, bots):
+    """
+    :return: A dict of TrueSkill ratings, rating the games in the order they were played
+    """
+    environment = trueskill.TrueSkill(draw_probability=0.0)
+    ratings = {bot: environment.create_rating() for bot in bots}
+    for record in sorted(records, key=lambda record: record["game"]):
+        # A bot playing itself would be rated twice in one game
+        if len(set(record["bots"])) < len(record["bots"]):
+            continue
+        rated = environment.rate([(ratings[bot],) for bot in record["bots"]], ranks=record["ranks"])
+        for bot, (rating,) in zip(record["bots"], rated):
+            ratings[bot] = rating
+    return ratings
+
+
+def report(records, bots, samples=200):
+    """
+    :return: The ratings table of the games played so far, best first
+    """
+    records = [record for record in records if "ranks" in record]
+    if not records:
+        return "No games played."
+    ratings = bradley_terry(pairwise_results(records), bots)
+    intervals = elo_intervals(records, bots, samples)
+    skills = trueskill_ratings(records, bots) if trueskill is not None else None
+
+    lines = ["{:<16} {:>6} {:>6} {:>9} {:>6}  {:<13}{}".format(
+        "bot", "games", "wins", "avg rank", "elo", "95% interval", "  trueskill" if skills else "")]
+    for bot in sorted(bots, key=ratings.get, reverse=True):
+        played = [(record, record["bots"].index(bot)) for record in records if bot in record["bots"]]
+        wins = sum(1 for record, slot in played if record["ranks"][slot] == 1)
+        average_rank = sum(record["ranks"][slot] for record, slot in played) / len(played) if played else 0
+        line = "{:<16} {:>6} {:>6} {:>9.2f} {:>6.0f}  [{:.0f}, {:.0f}]".format(
+            bot, len(played), wins, average_rank, ratings[bot], *intervals[bot])
+        if skills:
+            line = "{:<52}  {:.1f} +- {:.1f}".format(line, skills[bot].mu, 2 * skills[bot].sigma)
+        lines.append(line)
+    failed = sum(1 for record in records if record.get("errors"))
+    lines.append("{} games, {} with a crashed or timed out bot".format(len(records), failed))
+    return "\n".join(lines)
+
+
+def load_records(path):
+    """
+    :return: The game records already written to a results file
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as results:
+        return [json.loads(line) for line in results if line.strip()]
+
+
+def run_tournament(commands, games, output, sizes=MAP_SIZES, four_player_share=0.5, seed=0, workers=None,
+                   engine=None, in_process=False, timeout=GAME_TIMEOUT, turn_limit=None, log_directory=None, log=print):
+    """
+    Plays the scheduled games not yet in the output file, across a process pool.
+    :param commands: The bot command lines
+    :param games: How many games the tournament has in total
+    :param output: The results file, appended with one JSON line per game
+    :param log_directory: Directory to keep every game's bot logs in, under game-N; they are discarded if None
+    :return: The records of every game in the output file
+    """
+    labels = [bot_label(command) for command in commands]
+    records = load_records(output)
+    records = [record for record in records if record.get("labels") == labels]
+    done = {(record["game"], record["seed"]) for record in records}
+    pending = [game for game in schedule(len(commands), games, sizes, four_player_share, seed)
+               if (game["game"], game["seed"]) not in done]
+    if len(done):
+        log("Resuming: {} games already played".format(len(done)))
+
+    with open(output, "a") as results, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        futures = [pool.submit(_play, game, commands, engine, in_process, timeout, turn_limit, log_directory)
+                   for game in pending]
+        for finished, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            record = future.result()
+            record["labels"] = labels
+            record["bots"] = [labels[bot] for bot in record["lineup"]]
+            results.write(json.dumps(record) + "\n")
+            results.flush()
+            records.append(record)
+            if "error" in record:
+                log("[{}/{}] game {} failed: {}".format(finished, len(pending), record["game"], record["error"]))
+            else:
+                standings = sorted(zip(record["ranks"], record["bots"], record["scores"]))
+                log("[{}/{}] {}x{}: {}".format(finished, len(pending), record["size"], record["size"], ", ".join(
+                    "{} {}".format(bot, score) for _, bot, score in standings)))
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python3 -m arena.tournament", description="Rate bots over many games.")
+    parser.add_argument("bots", nargs="*", help="bot command lines (default: all the bots, or with --in-process "
+                                                 "those defining setup(game) and turn(game))")
+    parser.add_argument("-n", "--games", type=int, default=100, help="total number of games")
+    parser.add_argument("--sizes", type=int, nargs="+", default=MAP_SIZES, help="map sizes to play on")
+    parser.add_argument("--four-player-share", type=float, default=0.5, help="share of 4-player games")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="seed of the game schedule")
+    parser.add_argument("-j", "--workers", type=int, help="games played at once (default: one per core)")
+    parser.add_argument("--engine", help="engine command line (default: ./halite on macOS, else python3 -m arena)")
+    parser.add_argument("--in-process", action="store_true",
+                        help="load the bots into the worker processes; they must define setup(game) and turn(game)")
+    parser.add_argument("--game-timeout", type=float, default=GAME_TIMEOUT, help="seconds before a game is abandoned")
+    parser.add_argument("--turn-limit", type=int, help="stop games after this many turns")
+    parser.add_argument("--logs", help="keep the bots' log files of every game under this directory "
+                                       "(default: discard them)")
+    parser.add_argument("--bootstrap", type=int, default=200, help="bootstrap samples for the intervals")
+    parser.add_argument("-o", "--output", default="tournament.jsonl", help="results file, resumed if it exists")
+    args = parser.parse_args(argv)
+    bots = args.bots or DEFAULT_BOTS
+    if args.in_process:
+        from . import inprocess
+        unloadable = [command for command in bots
+                      if not inprocess.is_loadable(os.path.join(BOT_DIRECTORY, inprocess.bot_path(command)))]
+        if not args.bots:
+            bots = [command for command in bots if command not in unloadable]
+        elif unloadable:
+            parser.error("cannot play in-process, no setup(game) and turn(game) in: {}".format(", ".join(unloadable)))
+    if len(bots) < 2:
+        parser.error("a tournament needs at least 2 bots")
+
+    log_directory = os.path.abspath(args.logs) if args.logs else None
+    records = run_tournament(bots, args.games, args.output, args.sizes, args.four_player_share, args.seed,
+                             args.workers, args.engine, args.in_process, args.game_timeout, args.turn_limit,
+                             log_directory)
+    print(report(records, [bot_label(command) for command in bots], args.bootstrap))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,106 @@
+import sys
+import time
+
+
+class _InputBuffer:
+    """
+    Reads the engine's output from stdin in large chunks.
+
+    Lines are served by readline. Blocks of integers are served by read_ints,
+    which converts every complete line received so far with a single split,
+    instead of one input() and split() round trip per line.
+
+    Once read_ints has converted lines, where they start and end is lost: readline can
+    only follow read_ints once every converted integer has been read, and raises
+    ValueError otherwise. The lines of a frame are thus all read through read_ints.
+    """
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self):
+        self._buffer = b""
+        self._ints = []
+        self._position = 0
+        # time.perf_counter() value at which the engine's latest message started arriving
+        self.arrival = time.perf_counter()
+
+    def _read_chunk(self):
+        """
+        Reads whatever the engine has sent so far, blocking until something arrives.
+        :return: The bytes read
+        """
+        stream = getattr(sys.stdin, "buffer", sys.stdin)
+        if hasattr(stream, "read1"):
+            chunk = stream.read1(self.CHUNK_SIZE)
+        else:
+            chunk = stream.readline()
+        if not chunk:
+            raise EOFError("EOF when reading from the engine")
+        # Everything sent before was read: this is the start of a new message, e.g. a frame
+        if not self._buffer and self._position >= len(self._ints):
+            self.arrival = time.perf_counter()
+        return chunk.encode() if isinstance(chunk, str) else chunk
+
+    def readline(self):
+        """
+        :return: The next line sent by the engine, without its line break
+        """
+        if self._position < len(self._ints):
+            raise ValueError("{} integers read by read_ints are still unread".format(len(self._ints) - self._position))
+        while b"\n" not in self._buffer:
+            self._buffer += self._read_chunk()
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line.decode()
+
+    def read_ints(self, count):
+        """
+        Reads the next integers sent by the engine, regardless of how they are split in lines.
+        :param count: How many integers to read
+        :return: A list of count integers
+        """
+        while len(self._ints) - self._position < count:
+            end = self._buffer.rfind(b"\n") + 1
+            if not end:
+                self._buffer += self._read_chunk()
+                continue
+            self._ints = self._ints[self._position:] + list(map(int, self._buffer[:end].split()))
+            self._position = 0
+            self._buffer = self._buffer[end:]
+        ints = self._ints[self._position:self._position + count]
+        self._position += count
+        return ints
+
+
+_input = _InputBuffer()
+
+
 # Placed here to avoid circular imports
 def read_input():
     """
-    Reads input from stdin, shutting down logging and exiting if an EOFError occurs
+    Reads input from stdin, exiting if an EOFError occurs. Logging is shut down at exit,
+    after the exit handlers (e.g. the turn timing summary) have run.
     :return: input read
     """
     try:
-        return input()
+        return _input.readline()
+    except EOFError as eof:
+        raise SystemExit(eof)
+
+
+def arrival_time():
+    """
+    :return: The time.perf_counter() value at which the engine's latest message, e.g. the frame being read,
+        started arriving on stdin
+    """
+    return _input.arrival
+
+
+def read_ints(count):
+    """
+    Reads a block of integers from stdin, exiting if an EOFError occurs, like read_input
+    :param count: How many integers to read
+    :return: A list of count integers
+    """
+    try:
+        return _input.read_ints(count)
     except EOFError as eof:
-        logging.shutdown()
         raise SystemExit(eof)
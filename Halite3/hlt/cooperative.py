@@ -0,0 +1,240 @@
+import heapq
+
+from . import constants
+from .navigation import PathTree
+
+"""Turns ahead that ships plan and reserve their paths for."""
+DEFAULT_WINDOW = 8
+
+"""Halite a turn is worth against the halite spent moving, when ranking paths."""
+TURN_COST = 10
+
+"""Most states one search may expand before settling for the best partial path found."""
+MAX_EXPANSIONS = 2000
+
+
+class ReservationTable:
+    """
+    Which ship will be on which cell on which turn: a dict of (cell index, turn) to ship id.
+    """
+    def __init__(self):
+        self._owners = {}
+        # The (cell index, turn) keys held by every ship
+        self._held = {}
+
+    def owner(self, index, turn):
+        """
+        :return: The id of the ship holding that cell on that turn, or None
+        """
+        return self._owners.get((index, turn))
+
+    def is_free(self, index, turn, ship_id=None):
+        """
+        :return: Whether the cell is free on that turn, or held by ship_id itself
+        """
+        owner = self._owners.get((index, turn))
+        return owner is None or owner == ship_id
+
+    def reserve(self, ship_id, index, turn):
+        """
+        Holds a cell on a turn for a ship.
+        :return: nothing.
+        """
+        self._owners[(index, turn)] = ship_id
+        self._held.setdefault(ship_id, []).append((index, turn))
+
+    def release(self, ship_id):
+        """
+        Frees every cell the ship holds.
+        :return: nothing.
+        """
+        for key in self._held.pop(ship_id, ()):
+            if self._owners.get(key) == ship_id:
+                del self._owners[key]
+
+    def expire(self, turn):
+        """
+        Forgets the reservations of the turns before turn.
+        :return: nothing.
+        """
+        for ship_id, keys in list(self._held.items()):
+            current = [key for key in keys if key[1] >= turn]
+            for key in keys:
+                if key[1] < turn and self._owners.get(key) == ship_id:
+                    del self._owners[key]
+            if current:
+                self._held[ship_id] = current
+            else:
+                del self._held[ship_id]
+
+
+class CooperativePlanner:
+    """
+    Windowed cooperative A* (WHCA*): ships plan paths through space and time, window turns
+    ahead, around the cells other ships have reserved on each turn, then reserve their own
+    path. Ships planned first get priority, and ships planned later route around them rather
+    than jamming into them, e.g. around a shipyard.
+
+    Plans are kept from one turn to the next and only searched again when the ship is off
+    its plan, its goal changed, its next step is blocked, or fewer than half the window's
+    turns are left on it; a ship then plans around the paths the others still hold.
+
+    Searches minimize the halite spent moving plus TURN_COST per turn. The heuristic is the
+    exact cost to the goal ignoring the other ships, read from a PathTree of the goal with a
+    step cost of TURN_COST, so that a ship waits only for a reserved cell and the window's end
+    is judged by what is left to go. Ships swapping cells do not collide, so only two ships
+    on one cell on the same turn is a conflict. The planner keeps its
+    ships apart; combine it with MoveResolver for a guarantee against the ships it does not plan.
+    """
+    def __init__(self, game_map, window=DEFAULT_WINDOW):
+        self.game_map = game_map
+        self.window = window
+        self.table = ReservationTable()
+        self.turn = 0
+        # ship id -> (goal index, first turn, cell indices from that turn on)
+        self._plans = {}
+        self._requested = set()
+        # PathTree of every goal for the turn, for the heuristic
+        self._trees = {}
+        # Searches run this turn, for logging
+        self.searches = 0
+
+    def begin_turn(self, turn_number):
+        """
+        Starts a turn: forgets past reservations, and the plans of ships that asked for no move last turn.
+        :param turn_number: The current turn
+        :return: nothing.
+        """
+        self.turn = turn_number
+        self.table.expire(turn_number)
+        for ship_id in set(self._plans) - self._requested:
+            self.release(ship_id)
+        self._requested = set()
+        self._trees = {}
+        self.searches = 0
+
+    def release(self, ship_id):
+        """
+        Drops a ship's plan and its reservations.
+        :return: nothing.
+        """
+        self._plans.pop(ship_id, None)
+        self.table.release(ship_id)
+
+    def next_position(self, ship, goal, blocked=()):
+        """
+        :param ship: A ship of the fleet
+        :param goal: The position the ship is heading to
+        :param blocked: Positions the ship must not move onto this turn, e.g. other ships' next cells
+        :return: The position the ship should be on at the end of this turn
+        """
+        game_map = self.game_map
+        self._requested.add(ship.id)
+        start = game_map.halite.index(ship.position)
+        goal = game_map.halite.index(goal)
+        blocked = {game_map.halite.index(position) for position in blocked}
+
+        plan = self._plans.get(ship.id)
+        if plan is None or not self._holds(plan, start, goal, blocked):
+            self.release(ship.id)
+            path = self._search(ship, start, goal, blocked)
+            for offset, index in enumerate(path[1:], 1):
+                self.table.reserve(ship.id, index, self.turn + offset)
+            # Short of the goal, the ship waits at the path's end until it plans again
+            if path[-1] != goal:
+                for turn in range(self.turn + len(path), self.turn + self.window + 1):
+                    if not self.table.is_free(path[-1], turn, ship.id):
+                        break
+                    self.table.reserve(ship.id, path[-1], turn)
+            plan = self._plans[ship.id] = (goal, self.turn, path)
+
+        _, first_turn, path = plan
+        offset = self.turn - first_turn + 1
+        index = path[offset] if offset < len(path) else start
+        return game_map.position_of(index)
+
+    def arrival(self, ship_id):
+        """
+        :param ship_id: The id of a ship of the fleet
+        :return: The turn the ship's plan reaches its goal, or None if it does not within the window
+        """
+        plan = self._plans.get(ship_id)
+        if plan is None or plan[2][-1] != plan[0]:
+            return None
+        return plan[1] + len(plan[2]) - 1
+
+    def goal(self, ship_id):
+        """
+        :param ship_id: The id of a ship of the fleet
+        :return: The position the ship's plan heads to, or None if it has no plan
+        """
+        plan = self._plans.get(ship_id)
+        return self.game_map.position_of(plan[0]) if plan is not None else None
+
+    def _holds(self, plan, start, goal, blocked):
+        plan_goal, first_turn, path = plan
+        offset = self.turn - first_turn
+        if plan_goal != goal or offset >= len(path) or path[offset] != start:
+            return False
+        if offset + 1 < len(path) and path[offset + 1] in blocked:
+            return False
+        # Still on the plan; search again once it nears its end without reaching the goal
+        return path[-1] == goal or len(path) - offset > self.window // 2
+
+    def _waits(self, ship_id, index, turn):
+        # 2 if the ship can wait on the cell until the window's end, 1 for just the next turn, else 0
+        if not self.table.is_free(index, turn, ship_id):
+            return 0
+        return 1 + all(self.table.is_free(index, later, ship_id) for later in range(turn + 1, self.turn + self.window + 1))
+
+    def _search(self, ship, start, goal, blocked):
+        """
+        Space-time A* from the ship's cell, up to the goal or window turns ahead.
+        :return: The cell indices of the path, from the ship's cell on
+        """
+        self.searches += 1
+        game_map = self.game_map
+        neighbors = game_map.neighbor_indices
+        halite = game_map.halite
+        tree = self._trees.get(goal)
+        if tree is None:
+            tree = self._trees[goal] = PathTree(game_map, [game_map.position_of(goal)], TURN_COST)
+        estimate = tree.cost.__getitem__
+
+        can_move = ship.halite_amount >= halite.get(start) // constants.MOVE_COST_RATIO
+        # (cost + estimated cost to the goal, estimate, turns, cell, previous state), the cost
+        # being TURN_COST per turn plus the halite spent moving; ties go to the state nearer the goal
+        queue = [(estimate(start), estimate(start), 0, start, None)]
+        closed = {}
+        best = None
+        while queue and len(closed) < MAX_EXPANSIONS:
+            priority, remaining, turns, index, previous = heapq.heappop(queue)
+            if (index, turns) in closed:
+                continue
+            closed[(index, turns)] = previous
+            if index == goal or turns == self.window:
+                best = (index, turns)
+                break
+            # A partial path should end where the ship can wait out the window, or at least a turn
+            waits = self._waits(ship.id, index, self.turn + turns + 1)
+            if best is None or (-waits, remaining, priority) < best[2:]:
+                best = (index, turns, -waits, remaining, priority)
+            turn = self.turn + turns + 1
+            moves = neighbors[index] if turns or can_move else ()
+            step_cost = halite.get(index) // constants.MOVE_COST_RATIO
+            cost = priority - remaining + TURN_COST
+            for following, step in [(index, 0)] + [(neighbor, step_cost) for neighbor in moves]:
+                if (following, turns + 1) in closed or not self.table.is_free(following, turn, ship.id):
+                    continue
+                if turns == 0 and following in blocked:
+                    continue
+                following_remaining = estimate(following)
+                heapq.heappush(queue, (cost + step + following_remaining, following_remaining, turns + 1, following,
+                                       (index, turns)))
+
+        path = []
+        state = (best[0], best[1])
+        while state is not None:
+            path.append(state[0])
+            state = closed[state]
+        return path[::-1]
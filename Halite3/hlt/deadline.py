@@ -0,0 +1,100 @@
+import logging
+import signal
+import time
+
+from . import constants
+from .positionals import Direction
+
+"""Seconds from the arrival of the turn's frame after which the fallback commands are sent."""
+DEFAULT_BUDGET = 1.5
+
+"""Share of a full cargo from which the fallback heads a ship home."""
+RETURN_FRACTION = 0.9
+
+
+class TurnTimeout(BaseException):
+    """
+    Raised inside the strategy when the turn's budget runs out. Like KeyboardInterrupt,
+    it is not an Exception, so that strategies catching Exception do not swallow it.
+    """
+    pass
+
+
+def safe_commands(game):
+    """
+    Builds a cheap set of commands that cannot make two of your ships collide: ships with
+    nearly full cargo take one naive step towards their nearest depot when the cell is free,
+    every other ship stays still, and no ship is spawned.
+    :param game: The game, updated for this turn
+    :return: The list of commands
+    """
+    game_map = game.game_map
+    depot_field = game_map.get_depot_field(game.me)
+    taken = set()
+    commands = []
+    for ship in game.me.get_ships():
+        direction = Direction.Still
+        can_move = ship.halite_amount >= game_map[ship.position].halite_amount // constants.MOVE_COST_RATIO
+        if can_move and ship.halite_amount >= RETURN_FRACTION * constants.MAX_HALITE:
+            target = depot_field.nearest_depot(ship.position).position
+            for candidate in game_map.get_unsafe_moves(ship.position, target):
+                destination = game_map.normalize(ship.position.directional_offset(candidate))
+                # Only cells nobody stands on, so that a ship staying still is never run into
+                if not game_map[destination].is_occupied and destination not in taken:
+                    taken.add(destination)
+                    direction = candidate
+                    break
+        commands.append(ship.move(direction) if direction != Direction.Still else ship.stay_still())
+    return commands
+
+
+class DeadlineGuard:
+    """
+    Runs a strategy under a time budget, counted from the arrival of the turn's frame
+    (Game.turn_start), so that the wait for the other bots' turns is not held against it. Before the strategy starts, the safe_commands of
+    the turn are prepared; if the strategy is still running when the budget runs out, it is
+    interrupted (TurnTimeout is raised wherever it is) and the safe commands are sent instead,
+    so a slow turn costs that turn's moves rather than the game. State the strategy was
+    updating when interrupted may be left half done.
+
+    The interruption relies on SIGALRM, so on systems without it the strategy runs unguarded.
+    """
+    def __init__(self, game, budget=DEFAULT_BUDGET):
+        self.game = game
+        self.budget = budget
+        # Turns on which the fallback commands were sent
+        self.fallback_turns = []
+
+    def _expire(self, signum, frame):
+        raise TurnTimeout()
+
+    def run(self, strategy):
+        """
+        :param strategy: Function of the game returning the turn's commands
+        :return: The strategy's commands, or the safe commands if it ran out of time
+        """
+        if not hasattr(signal, "setitimer"):
+            return strategy(self.game)
+
+        fallback = safe_commands(self.game)
+        remaining = self.budget - (time.perf_counter() - self.game.turn_start)
+        if remaining <= 0:
+            return self._fall_back(fallback)
+
+        previous = signal.signal(signal.SIGALRM, self._expire)
+        try:
+            signal.setitimer(signal.ITIMER_REAL, remaining)
+            try:
+                return strategy(self.game)
+            finally:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        except TurnTimeout:
+            return self._fall_back(fallback)
+        finally:
+            signal.signal(signal.SIGALRM, previous)
+
+    def _fall_back(self, fallback):
+        self.fallback_turns.append(self.game.turn_number)
+        logging.warning("Turn {}: strategy ran out of its {:.2f} s budget, sent the safe commands".format(
+            self.game.turn_number, self.budget))
+        return fallback
@@ -0,0 +1,74 @@
+from .layers import Layer, numpy
+
+
+class DepotField:
+    """
+    Distance from every cell of the map to the nearest depot (shipyard or dropoff)
+    of one player, along with which depot that is.
+
+    Obtain it through GameMap.get_depot_field, which keeps it current.
+    """
+    def __init__(self, game_map, player):
+        self.game_map = game_map
+        self.player = player
+        self.depots = []
+        self.distance = Layer(game_map.width, game_map.height)
+        # Index within depots of the nearest depot for every cell
+        self.nearest = Layer(game_map.width, game_map.height)
+        self._depot_ids = None
+
+    def update(self):
+        """
+        Recomputes the field if the player has built a dropoff since the last update.
+        :return: nothing.
+        """
+        dropoffs = self.player.get_dropoffs()
+        depot_ids = tuple(dropoff.id for dropoff in dropoffs)
+        if depot_ids == self._depot_ids:
+            return
+        self._depot_ids = depot_ids
+        # Dropoffs first, then the shipyard: ties go to the depot listed first
+        self.depots = dropoffs + [self.player.shipyard]
+        if self.distance.is_numpy:
+            self._compute_numpy()
+        else:
+            self._compute()
+
+    def _compute(self):
+        width, height = self.game_map.width, self.game_map.height
+        x_distance, y_distance = self.game_map.x_distance, self.game_map.y_distance
+        for index in range(width * height):
+            x, y = index % width, index // width
+            best, best_distance = 0, None
+            for depot_index, depot in enumerate(self.depots):
+                distance = x_distance[(x - depot.position.x) % width] + y_distance[(y - depot.position.y) % height]
+                if best_distance is None or distance < best_distance:
+                    best, best_distance = depot_index, distance
+            self.distance.set(index, best_distance)
+            self.nearest.set(index, best)
+
+    def _compute_numpy(self):
+        width, height = self.game_map.width, self.game_map.height
+        x_distance = numpy.array(self.game_map.x_distance)
+        y_distance = numpy.array(self.game_map.y_distance)
+        xs, ys = numpy.arange(width), numpy.arange(height)
+        distances = numpy.stack([
+            y_distance[(ys - depot.position.y) % height][:, None] + x_distance[(xs - depot.position.x) % width][None, :]
+            for depot in self.depots]).reshape(len(self.depots), -1)
+        nearest = distances.argmin(axis=0)
+        self.nearest.data[:] = nearest
+        self.distance.data[:] = distances[nearest, numpy.arange(width * height)]
+
+    def distance_at(self, position):
+        """
+        :param position: A position object
+        :return: The distance from that position to the nearest depot
+        """
+        return self.distance[position]
+
+    def nearest_depot(self, position):
+        """
+        :param position: A position object
+        :return: The nearest shipyard or dropoff entity to that position
+        """
+        return self.depots[self.nearest[position]]
@@ -49,10 +49,14 @@ class Shipyard(Entity):
 class Ship(Entity):
     """
     Ship class to house ship entities
+
+    Ships persist from turn to turn while they are alive, so strategy code
+    can keep per-ship state in memory; it goes away with the ship.
     """
     def __init__(self, owner, id, position, halite_amount):
         super().__init__(owner, id, position)
         self.halite_amount = halite_amount
+        self.memory = {}
 
     @property
     def is_full(self):
@@ -0,0 +1,152 @@
+import heapq
+import logging
+
+from . import constants
+from .positionals import Direction
+
+
+class MoveResolver:
+    """
+    Assigns every ship of the fleet a move so that no two ships end the turn on the same cell.
+
+    Each ship states its ranked preferences (positions or directions); the resolver picks the
+    assignment with the lowest total rank as a min-cost bipartite matching between ships and
+    cells, solved by successive shortest paths. Staying still is always a last-resort option,
+    and is the only option for a ship without enough halite to move.
+
+    Ships exchanging cells do not collide in Halite, so swaps are allowed; they are listed in
+    swaps after resolving. Cells passed as shared (e.g. your own depots at the end of the game)
+    may receive any number of ships.
+    """
+    def __init__(self, game_map, shared=()):
+        self.game_map = game_map
+        self.shared = {game_map.normalize(position) for position in shared}
+        self.swaps = []
+        self._ships = []
+        self._options = []
+        self._targets = None
+
+    def request(self, ship, preferences):
+        """
+        Registers the moves a ship would like to make, best first.
+        :param ship: The ship to move
+        :param preferences: Positions (the ship's cell or a neighbor) or directions, best first
+        :return: nothing.
+        """
+        still = self.game_map.normalize(ship.position)
+        options = {}
+        if ship.halite_amount >= self.game_map[still].halite_amount // constants.MOVE_COST_RATIO:
+            neighbors = {self.game_map.normalize(still.directional_offset(direction))
+                         for direction in Direction.get_all_cardinals()}
+            for preference in preferences:
+                if not hasattr(preference, "x"):
+                    preference = still.directional_offset(preference)
+                preference = self.game_map.normalize(preference)
+                if preference != still and preference not in neighbors:
+                    raise ValueError("{} is not a move away for {}".format(preference, ship))
+                options.setdefault(preference, len(options))
+        # Staying still is always possible, if only as a last resort
+        options.setdefault(still, len(preferences) + 1)
+        self._ships.append(ship)
+        self._options.append(list(options.items()))
+        self._targets = None
+
+    def resolve(self):
+        """
+        Computes the collision-free assignment for all requested ships.
+        :return: A dict mapping ship ids to the position each ship ends the turn on
+        """
+        if self._targets is not None:
+            return self._targets
+
+        ship_potential = [0] * len(self._ships)
+        cell_potential = {}
+        match = [None] * len(self._ships)
+        owner = {}
+
+        for root in range(len(self._ships)):
+            end, previous, finalized = self._shortest_augmenting_path(root, ship_potential, cell_potential, owner)
+            if end is None:
+                # Cannot happen while every ship stands on its own cell; stay still regardless
+                logging.warning("No collision-free move for {}".format(self._ships[root]))
+                match[root] = self.game_map.normalize(self._ships[root].position)
+                continue
+
+            for cell, distance in finalized.items():
+                cell_potential[cell] = cell_potential.get(cell, 0) - (finalized[end] - distance)
+
+            changed = []
+            cell = end
+            while True:
+                ship = previous[cell]
+                match[ship], cell = cell, match[ship]
+                if match[ship] not in self.shared:
+                    owner[match[ship]] = ship
+                changed.append(ship)
+                if ship == root:
+                    break
+
+            changed.extend(owner[cell] for cell in finalized if cell in owner)
+            for ship in changed:
+                cost = dict(self._options[ship])[match[ship]]
+                ship_potential[ship] = cost - cell_potential.get(match[ship], 0)
+
+        self._targets = {ship.id: target for ship, target in zip(self._ships, match)}
+        standing = {self.game_map.normalize(ship.position): ship.id for ship in self._ships}
+        self.swaps = []
+        for ship in self._ships:
+            other_id = standing.get(self._targets[ship.id])
+            if other_id is not None and ship.id < other_id and \
+                    self._targets[other_id] == self.game_map.normalize(ship.position):
+                self.swaps.append((ship.id, other_id))
+        return self._targets
+
+    def _shortest_augmenting_path(self, root, ship_potential, cell_potential, owner):
+        """
+        Runs Dijkstra on reduced costs from an unassigned ship until it reaches a free cell.
+        :return: The free cell reached (or None), the ship each cell was reached from,
+            and the distance of every cell settled on the way
+        """
+        distances = {}
+        previous = {}
+        finalized = {}
+        queue = []
+
+        def relax(ship, base):
+            for cell, cost in self._options[ship]:
+                if cell in finalized:
+                    continue
+                distance = base + cost - ship_potential[ship] - cell_potential.get(cell, 0)
+                if cell not in distances or distance < distances[cell]:
+                    distances[cell] = distance
+                    previous[cell] = ship
+                    heapq.heappush(queue, (distance, cell.y, cell.x, cell))
+
+        relax(root, 0)
+        while queue:
+            distance, _, _, cell = heapq.heappop(queue)
+            if cell in finalized:
+                continue
+            finalized[cell] = distance
+            if cell in self.shared or cell not in owner:
+                return cell, previous, finalized
+            relax(owner[cell], distance)
+        return None, previous, finalized
+
+    def direction(self, ship):
+        """
+        :param ship: A ship that was requested
+        :return: The direction moving that ship to its assigned cell
+        """
+        target = self.resolve()[ship.id]
+        for direction in Direction.get_all_cardinals():
+            if self.game_map.normalize(ship.position.directional_offset(direction)) == target:
+                return direction
+        return Direction.Still
+
+    def commands(self):
+        """
+        :return: The move commands for every requested ship
+        """
+        self.resolve()
+        return [ship.move(self.direction(ship)) for ship in self._ships]
@@ -2,8 +2,14 @@ import queue
 
 from . import constants
 from .entity import Entity, Shipyard, Ship, Dropoff
-from .positionals import Direction, Position
-from .common import read_input
+from .depots import DepotField
+from .inspiration import Inspiration
+from .layers import Layer, EMPTY
+from .navigation import PathTree
+from .neighborhood import HaliteNeighborhood
+from .richest import RichestCells
+from .positionals import Direction, Position, intern_positions
+from .common import read_input, read_ints
 
 
 class Player:
@@ -16,6 +22,8 @@ class Player:
         self.halite_amount = halite
         self._ships = {}
         self._dropoffs = {}
+        self.spawned_ship_ids = set()
+        self.destroyed_ship_ids = set()
 
     def get_ship(self, ship_id):
         """
@@ -59,34 +67,127 @@ class Player:
 
 
     @staticmethod
-    def _generate():
+    def _generate(read_line=read_input):
         """
         Creates a player object from the input given by the game engine
+        :param read_line: Function returning the engine's next line
         :return: The player object
         """
-        player, shipyard_x, shipyard_y = map(int, read_input().split())
+        player, shipyard_x, shipyard_y = map(int, read_line().split())
         return Player(player, Shipyard(player, -1, Position(shipyard_x, shipyard_y)))
 
-    def _update(self, num_ships, num_dropoffs, halite):
+    def _update(self, num_ships, num_dropoffs, halite, entities=None):
         """
         Updates this player object considering the input from the game engine for the current specific turn.
+        Ships and dropoffs seen on earlier turns are kept and updated in place; the ids of ships
+        that appeared or disappeared this turn are left in spawned_ship_ids and destroyed_ship_ids.
         :param num_ships: The number of ships this player has this turn
         :param num_dropoffs: The number of dropoffs this player has this turn
         :param halite: How much halite the player has in total
+        :param entities: The integers describing the ships, then the dropoffs, as sent by the engine.
+            Read from the engine if not given.
         :return: nothing.
         """
         self.halite_amount = halite
-        self._ships = {id: ship for (id, ship) in [Ship._generate(self.id) for _ in range(num_ships)]}
-        self._dropoffs = {id: dropoff for (id, dropoff) in [Dropoff._generate(self.id) for _ in range(num_dropoffs)]}
+        if entities is None:
+            entities = read_ints(4 * num_ships + 3 * num_dropoffs)
+
+        ships = {}
+        self.spawned_ship_ids = set()
+        ship_data = 4 * num_ships
+        for i in range(0, ship_data, 4):
+            ship_id = entities[i]
+            ship = self._ships.get(ship_id)
+            if ship is None:
+                ship = Ship(self.id, ship_id, Position(entities[i + 1], entities[i + 2]), entities[i + 3])
+                self.spawned_ship_ids.add(ship_id)
+            else:
+                ship.position = Position(entities[i + 1], entities[i + 2])
+                ship.halite_amount = entities[i + 3]
+            ships[ship_id] = ship
+        self.destroyed_ship_ids = self._ships.keys() - ships.keys()
+        self._ships = ships
+
+        for i in range(ship_data, ship_data + 3 * num_dropoffs, 3):
+            if entities[i] not in self._dropoffs:
+                self._dropoffs[entities[i]] = Dropoff(self.id, entities[i],
+                                                      Position(entities[i + 1], entities[i + 2]))
 
 
 class MapCell:
-    """A cell on the game map."""
+    """
+    A cell on the game map.
+
+    Once the cell belongs to a GameMap its halite amount and ship/structure
+    owners are read from and written to the map's layers.
+    """
     def __init__(self, position, halite_amount):
         self.position = position
-        self.halite_amount = halite_amount
-        self.ship = None
-        self.structure = None
+        self._halite_amount = halite_amount
+        self._ship = None
+        self._structure = None
+        self._game_map = None
+        self._index = None
+
+    def _bind(self, game_map, index):
+        """
+        Attaches this cell to the layers of a game map.
+        :param game_map: The map owning this cell
+        :param index: The flat index of this cell within the map layers
+        :return: nothing.
+        """
+        self._game_map = game_map
+        self._index = index
+        game_map.halite.set(index, self._halite_amount)
+        # Re-assign through the setters to copy the owners into the layers
+        self.ship = self._ship
+        self.structure = self._structure
+
+    @property
+    def halite_amount(self):
+        """
+        :return: The amount of halite in this cell
+        """
+        if self._game_map is None:
+            return self._halite_amount
+        return self._game_map.halite.get(self._index)
+
+    @halite_amount.setter
+    def halite_amount(self, halite_amount):
+        self._halite_amount = halite_amount
+        if self._game_map is not None:
+            self._game_map.halite.set(self._index, halite_amount)
+
+    @property
+    def ship(self):
+        """
+        :return: The ship in this cell, or None
+        """
+        return self._ship
+
+    @ship.setter
+    def ship(self, ship):
+        self._ship = ship
+        if self._game_map is not None:
+            if ship is None:
+                self._game_map.ship_owner.set(self._index, EMPTY)
+                self._game_map._occupied.discard(self._index)
+            else:
+                self._game_map.ship_owner.set(self._index, ship.owner)
+                self._game_map._occupied.add(self._index)
+
+    @property
+    def structure(self):
+        """
+        :return: The shipyard or dropoff in this cell, or None
+        """
+        return self._structure
+
+    @structure.setter
+    def structure(self, structure):
+        self._structure = structure
+        if self._game_map is not None:
+            self._game_map.structure_owner.set(self._index, EMPTY if structure is None else structure.owner)
 
     @property
     def is_empty(self):
@@ -140,11 +241,41 @@ class GameMap:
 
     Can be indexed by a position, or by a contained entity.
     Coordinates start at 0. Coordinates are normalized for you
+
+    Halite, ship owners and structure owners are also kept in contiguous
+    layers (halite, ship_owner, structure_owner) for whole-map queries.
+    Owner layers hold the owning player id, or EMPTY.
+
+    dirty_cells holds the positions whose halite changed during the last update,
+    and generation counts the updates. richest ranks the cells by halite.
     """
     def __init__(self, cells, width, height):
         self.width = width
         self.height = height
+        intern_positions(width, height)
         self._cells = cells
+        # Flat indices of the cells currently holding a ship
+        self._occupied = set()
+        self.dirty_cells = set()
+        self.halite = Layer(width, height)
+        self.ship_owner = Layer(width, height, EMPTY)
+        self.structure_owner = Layer(width, height, EMPTY)
+        for y in range(height):
+            for x in range(width):
+                cells[y][x]._bind(self, y * width + x)
+        # Wrapped distance along each axis, indexed by the coordinate difference modulo the map size
+        self.x_distance = [min(dx, width - dx) for dx in range(width)]
+        self.y_distance = [min(dy, height - dy) for dy in range(height)]
+        # Flat indices of the cardinal neighbors of every cell, in Direction.get_all_cardinals order
+        self.neighbor_indices = [
+            tuple(((y + dy) % height) * width + (x + dx) % width for dx, dy in Direction.get_all_cardinals())
+            for y in range(height) for x in range(width)]
+        self.generation = 0
+        self._depot_fields = {}
+        self._path_trees = {}
+        self._neighborhoods = {}
+        self._inspirations = {}
+        self.richest = RichestCells(self)
 
     def __getitem__(self, location):
         """
@@ -159,6 +290,14 @@ class GameMap:
             return self._cells[location.position.y][location.position.x]
         return None
 
+    def position_of(self, index):
+        """
+        Converts a flat layer index back into a position.
+        :param index: The index of a cell within the map layers
+        :return: The position of that cell
+        """
+        return Position(index % self.width, index // self.width)
+
     def calculate_distance(self, source, target):
         """
         Compute the Manhattan distance between two locations.
@@ -167,11 +306,59 @@ class GameMap:
         :param target: The target to where calculate
         :return: The distance between these items
         """
-        source = self.normalize(source)
-        target = self.normalize(target)
-        resulting_position = abs(source - target)
-        return min(resulting_position.x, self.width - resulting_position.x) + \
-            min(resulting_position.y, self.height - resulting_position.y)
+        return self.x_distance[(source.x - target.x) % self.width] + \
+            self.y_distance[(source.y - target.y) % self.height]
+
+    def get_depot_field(self, player):
+        """
+        Returns the distance from every cell to the player's nearest shipyard or dropoff.
+        The field is only recomputed when the player has built a new dropoff.
+        :param player: The player owning the depots
+        :return: The DepotField for that player
+        """
+        field = self._depot_fields.get(player.id)
+        if field is None:
+            field = self._depot_fields[player.id] = DepotField(self, player)
+        field.update()
+        return field
+
+    def get_path_tree(self, *targets):
+        """
+        Returns the cheapest paths from every cell to the nearest of the targets, considering
+        the halite it costs to move off each cell. Trees are cached until the next update.
+        :param targets: One or more positions to navigate to
+        :return: The PathTree for those targets
+        """
+        key = tuple(self.normalize(target) for target in targets)
+        tree = self._path_trees.get(key)
+        if tree is None:
+            tree = self._path_trees[key] = PathTree(self, key)
+        return tree
+
+    def get_halite_neighborhood(self, radius):
+        """
+        Returns the sum, mean and maximum of the halite within a Manhattan radius of every
+        cell. They are cached until the next update.
+        :param radius: The largest distance from each cell to include
+        :return: The HaliteNeighborhood for that radius
+        """
+        neighborhood = self._neighborhoods.get(radius)
+        if neighborhood is None:
+            neighborhood = self._neighborhoods[radius] = HaliteNeighborhood(self, radius)
+        return neighborhood
+
+    def get_inspiration(self, player_id, occupancy):
+        """
+        Returns where a ship of the player would be inspired, and what mining each cell would
+        yield it. They are cached until the next update.
+        :param player_id: The id of the player whose ships would mine
+        :param occupancy: Where every player's ships are this turn, i.e. Game.occupancy
+        :return: The Inspiration for that player
+        """
+        inspiration = self._inspirations.get(player_id)
+        if inspiration is None:
+            inspiration = self._inspirations[player_id] = Inspiration(self, player_id, occupancy)
+        return inspiration
 
     def normalize(self, position):
         """
@@ -237,32 +424,67 @@ class GameMap:
 
         return Direction.Still
 
+    def navigate(self, ship, destination):
+        """
+        Returns a singular safe move along the cheapest path towards the destination,
+        falling back to naive_navigate when the next cell on that path is occupied.
+
+        :param ship: The ship to move.
+        :param destination: Ending position
+        :return: A direction.
+        """
+        direction = self.get_path_tree(destination).direction_from(ship.position)
+        if direction == Direction.Still:
+            return direction
+        target_pos = ship.position.directional_offset(direction)
+        if not self[target_pos].is_occupied:
+            self[target_pos].mark_unsafe(ship)
+            return direction
+        return self.naive_navigate(ship, destination)
+
     @staticmethod
-    def _generate():
+    def _generate(read_line=read_input):
         """
         Creates a map object from the input given by the game engine
+        :param read_line: Function returning the engine's next line
         :return: The map object
         """
-        map_width, map_height = map(int, read_input().split())
+        map_width, map_height = map(int, read_line().split())
+        intern_positions(map_width, map_height)
         game_map = [[None for _ in range(map_width)] for _ in range(map_height)]
         for y_position in range(map_height):
-            cells = read_input().split()
+            cells = read_line().split()
             for x_position in range(map_width):
                 game_map[y_position][x_position] = MapCell(Position(x_position, y_position),
                                                            int(cells[x_position]))
         return GameMap(game_map, map_width, map_height)
 
-    def _update(self):
+    def _update(self, changed_cells=None):
         """
-        Updates this map object from the input given by the game engine
+        Updates this map object from the input given by the game engine.
+        Only the cells that held a ship last turn are cleared, and only the
+        cells reported by the engine are rewritten; those are collected in dirty_cells.
+        :param changed_cells: The x, y, halite integers of every changed cell, as sent by the engine.
+            Read from the engine if not given.
         :return: nothing
         """
         # Mark cells as safe for navigation (will re-mark unsafe cells
         # later)
-        for y in range(self.height):
-            for x in range(self.width):
-                self[Position(x, y)].ship = None
-
-        for _ in range(int(read_input())):
-            cell_x, cell_y, cell_energy = map(int, read_input().split())
-            self[Position(cell_x, cell_y)].halite_amount = cell_energy
+        for index in self._occupied:
+            self._cells[index // self.width][index % self.width]._ship = None
+            self.ship_owner.set(index, EMPTY)
+        self._occupied.clear()
+        self.generation += 1
+        self._path_trees.clear()
+        self._neighborhoods.clear()
+        self._inspirations.clear()
+
+        if changed_cells is None:
+            changed_cells = read_ints(3 * read_ints(1)[0])
+
+        self.dirty_cells = set()
+        for i in range(0, len(changed_cells), 3):
+            position = Position(changed_cells[i], changed_cells[i + 1])
+            self[position].halite_amount = changed_cells[i + 2]
+            self.dirty_cells.add(position)
+        self.richest.update(self.dirty_cells)
@@ -0,0 +1,90 @@
+from . import constants
+from .layers import Layer
+from .neighborhood import diamond_sum
+
+
+class Inspiration:
+    """
+    Which cells would inspire a ship of one player, and how much halite mining each cell
+    would bring that ship this turn, for the whole map at once.
+
+    A ship is inspired when at least INSPIRATION_SHIP_COUNT opponent ships are within
+    INSPIRATION_RADIUS, so the opponents on every cell are counted by summing a 0/1 layer
+    of their ships, merged from the Occupancy's per-player ship layers, over the inspiration
+    diamond. The map's cells are not used, as they also hold the cells reserved while
+    navigating. Counts use the ships' current positions, while the engine counts after
+    this turn's moves.
+
+    Obtain it through GameMap.get_inspiration, which caches one per player for the turn.
+    """
+    def __init__(self, game_map, player_id, occupancy):
+        """
+        :param game_map: The game map
+        :param player_id: The id of the player whose ships would mine
+        :param occupancy: Where every player's ships are this turn, i.e. Game.occupancy
+        """
+        self.game_map = game_map
+        self.player_id = player_id
+        self.occupancy = occupancy
+        self._enemies = None
+        self._inspired = None
+        self._mining_yield = None
+
+    @property
+    def enemies(self):
+        """
+        :return: A layer of the number of opponent ships within INSPIRATION_RADIUS of every cell
+        """
+        if self._enemies is None:
+            ships = Layer(self.game_map.width, self.game_map.height)
+            for player_id in self.occupancy.player_ids(exclude=self.player_id):
+                layer = self.occupancy.ship_layer(player_id)
+                if ships.is_numpy:
+                    ships.data |= layer.data
+                else:
+                    for index, occupied in enumerate(layer.data):
+                        if occupied:
+                            ships.set(index, 1)
+            self._enemies = diamond_sum(ships, constants.INSPIRATION_RADIUS)
+        return self._enemies
+
+    @property
+    def inspired(self):
+        """
+        :return: A layer holding 1 on the cells where a ship of the player would be inspired, 0 elsewhere
+        """
+        if self._inspired is None:
+            self._inspired = Layer(self.game_map.width, self.game_map.height)
+            if not constants.INSPIRATION_ENABLED:
+                return self._inspired
+            if self._inspired.is_numpy:
+                self._inspired.data[:] = self.enemies.data >= constants.INSPIRATION_SHIP_COUNT
+            else:
+                for index, count in enumerate(self.enemies.data):
+                    if count >= constants.INSPIRATION_SHIP_COUNT:
+                        self._inspired.set(index, 1)
+        return self._inspired
+
+    @property
+    def mining_yield(self):
+        """
+        :return: A layer of the halite an empty ship of the player would collect by mining each cell this turn,
+            including the inspiration bonus
+        """
+        if self._mining_yield is None:
+            self._mining_yield = Layer(self.game_map.width, self.game_map.height)
+            halite, inspired = self.game_map.halite.data, self.inspired.data
+            if self._mining_yield.is_numpy:
+                plain = -(-halite // constants.EXTRACT_RATIO)
+                boosted = -(-halite // constants.INSPIRED_EXTRACT_RATIO)
+                boosted = boosted + (boosted * constants.INSPIRED_BONUS_MULTIPLIER).astype(halite.dtype)
+                self._mining_yield.data[:] = (plain + inspired * (boosted - plain)).clip(max=constants.MAX_HALITE)
+            else:
+                for index, (cell_halite, cell_inspired) in enumerate(zip(halite, inspired)):
+                    if cell_inspired:
+                        extracted = -(-cell_halite // constants.INSPIRED_EXTRACT_RATIO)
+                        extracted += int(extracted * constants.INSPIRED_BONUS_MULTIPLIER)
+                    else:
+                        extracted = -(-cell_halite // constants.EXTRACT_RATIO)
+                    self._mining_yield.set(index, min(extracted, constants.MAX_HALITE))
+        return self._mining_yield
@@ -0,0 +1,93 @@
+"""
+Contiguous per-cell storage for the game map.
+
+A layer holds one value for every cell of the map in row-major order
+(index = y * width + x). NumPy arrays are used when NumPy is installed,
+otherwise the storage falls back to the standard library array module.
+Set USE_NUMPY to False before the game starts to force the fallback.
+"""
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+"""Whether new layers are backed by NumPy arrays."""
+USE_NUMPY = numpy is not None
+
+"""Value stored in owner layers for cells without a ship or structure."""
+EMPTY = -1
+
+
+class Layer:
+    """
+    A width x height grid of numbers stored in one flat buffer.
+
+    Can be indexed by a position (normalized for you) or read and written
+    by flat index through get and set.
+    """
+    def __init__(self, width, height, fill=0, typecode='l'):
+        self.width = width
+        self.height = height
+        self.typecode = typecode
+        if USE_NUMPY:
+            self.data = numpy.full(width * height, fill, dtype=typecode)
+            self.get = self.data.item
+        else:
+            self.data = array.array(typecode, [fill]) * (width * height)
+            self.get = self.data.__getitem__
+        self.set = self.data.__setitem__
+
+    @property
+    def is_numpy(self):
+        """
+        :return: Whether this layer is backed by a NumPy array
+        """
+        return not isinstance(self.data, array.array)
+
+    def index(self, position):
+        """
+        Returns the flat index of a position, accounting for wrap-around.
+        :param position: A position object
+        :return: The index of that cell within data
+        """
+        return (position.y % self.height) * self.width + position.x % self.width
+
+    def fill(self, value):
+        """
+        Sets every cell of this layer to the same value.
+        :param value: The value to store
+        :return: nothing.
+        """
+        if self.is_numpy:
+            self.data.fill(value)
+        else:
+            self.data[:] = array.array(self.typecode, [value]) * len(self)
+
+    def as_grid(self):
+        """
+        Returns the layer as rows of cells, indexed as grid[y][x].
+        With NumPy this is a (height, width) view sharing memory with the layer,
+        without it a list of row copies.
+        :return: The layer contents as a grid
+        """
+        if self.is_numpy:
+            return self.data.reshape(self.height, self.width)
+        return [self.data[y * self.width:(y + 1) * self.width].tolist() for y in range(self.height)]
+
+    def __getitem__(self, position):
+        return self.get(self.index(position))
+
+    def __setitem__(self, position, value):
+        self.set(self.index(position), value)
+
+    def __len__(self):
+        return self.width * self.height
+
+    def __repr__(self):
+        return "{}({}x{}, {})".format(self.__class__.__name__,
+                                      self.width,
+                                      self.height,
+                                      "numpy" if self.is_numpy else "array")
@@ -0,0 +1,102 @@
+import heapq
+
+from . import constants
+from .positionals import Direction
+
+
+class PathTree:
+    """
+    Cheapest paths from every cell of the map to the nearest of one or more targets.
+
+    Moving off a cell costs cell_halite / MOVE_COST_RATIO (truncated), plus an optional
+    flat step_cost per move; ties between equally cheap paths go to the shorter one.
+    Paths wrap around the map edges.
+
+    Obtain it through GameMap.get_path_tree, which caches one tree per target for the turn.
+    """
+    def __init__(self, game_map, targets, step_cost=0):
+        self.game_map = game_map
+        self.targets = [game_map.normalize(target) for target in targets]
+        self.step_cost = step_cost
+        size = game_map.width * game_map.height
+        # Halite spent, number of moves and first move of the best path from every cell
+        self.cost = [None] * size
+        self.steps = [None] * size
+        self.directions = [Direction.Still] * size
+        self._search()
+
+    def _search(self):
+        """
+        Runs Dijkstra outward from the targets, following moves in reverse.
+        :return: nothing.
+        """
+        game_map = self.game_map
+        halite = game_map.halite.data.tolist()
+        neighbors = game_map.neighbor_indices
+        cardinals = Direction.get_all_cardinals()
+        ratio = constants.MOVE_COST_RATIO
+        cost, steps, directions = self.cost, self.steps, self.directions
+
+        queue = []
+        for target in self.targets:
+            index = target.y * game_map.width + target.x
+            cost[index], steps[index] = 0, 0
+            queue.append((0, 0, index))
+        heapq.heapify(queue)
+
+        while queue:
+            current_cost, current_steps, index = heapq.heappop(queue)
+            if current_cost > cost[index] or (current_cost == cost[index] and current_steps > steps[index]):
+                continue
+            for direction, neighbor in zip(cardinals, neighbors[index]):
+                # The neighbor reaches this cell by moving the opposite way
+                neighbor_cost = current_cost + halite[neighbor] // ratio + self.step_cost
+                neighbor_steps = current_steps + 1
+                if cost[neighbor] is None or neighbor_cost < cost[neighbor] or \
+                        (neighbor_cost == cost[neighbor] and neighbor_steps < steps[neighbor]):
+                    cost[neighbor], steps[neighbor] = neighbor_cost, neighbor_steps
+                    directions[neighbor] = Direction.invert(direction)
+                    heapq.heappush(queue, (neighbor_cost, neighbor_steps, neighbor))
+
+    def _index(self, position):
+        return (position.y % self.game_map.height) * self.game_map.width + position.x % self.game_map.width
+
+    def direction_from(self, position):
+        """
+        :param position: The starting position
+        :return: The first move of the best path from there, Direction.Still on a target
+        """
+        return self.directions[self._index(position)]
+
+    def next_position(self, position):
+        """
+        :param position: The starting position
+        :return: The normalized position after the first move of the best path from there
+        """
+        return self.game_map.normalize(position.directional_offset(self.direction_from(position)))
+
+    def cost_from(self, position):
+        """
+        :param position: The starting position
+        :return: The halite spent moving along the best path from there
+        """
+        return self.cost[self._index(position)]
+
+    def steps_from(self, position):
+        """
+        :param position: The starting position
+        :return: The number of moves along the best path from there
+        """
+        return self.steps[self._index(position)]
+
+    def path_from(self, position):
+        """
+        :param position: The starting position
+        :return: The positions visited along the best path from there, ending on a target
+        """
+        position = self.game_map.normalize(position)
+        path = []
+        for _ in range(self.steps_from(position)):
+            position = self.next_position(position)
+            path.append(position)
+        return path
@@ -0,0 +1,124 @@
+from .layers import Layer, numpy
+
+
+def diamond_size(radius):
+    """
+    :param radius: A radius
+    :return: The number of cells within that Manhattan distance of a cell
+    """
+    return 2 * radius * (radius + 1) + 1
+
+
+def diamond_sum(layer, radius):
+    """
+    Sums a layer over the Manhattan diamond of the given radius around every cell, wrapping
+    around the map edges. Each row of the diamond is read from wrapped prefix sums of the
+    rows of the layer, so the cost is O(cells * radius) whatever the radius.
+    Radii of half the map size or more count the cells reached both ways round more than once.
+    :param layer: The layer to sum
+    :param radius: The largest distance from the centre cell to include
+    :return: A new layer holding the sum around every cell
+    """
+    width, height = layer.width, layer.height
+    sums = Layer(width, height)
+    if layer.is_numpy:
+        grid = layer.as_grid()
+        padded = numpy.pad(grid, ((0, 0), (radius, radius)), mode="wrap")
+        prefix = numpy.zeros((height, width + 2 * radius + 1), dtype=numpy.int64)
+        numpy.cumsum(padded, axis=1, out=prefix[:, 1:])
+        total = numpy.zeros((height, width), dtype=numpy.int64)
+        for dy in range(-radius, radius + 1):
+            # Row y + dy of the diamond spans x - half .. x + half
+            half = radius - abs(dy)
+            row_sums = prefix[:, radius + half + 1:radius + half + 1 + width] - prefix[:, radius - half:radius - half + width]
+            total += numpy.roll(row_sums, -dy, axis=0)
+        sums.data[:] = total.reshape(-1)
+        return sums
+
+    prefixes = []
+    for row in layer.as_grid():
+        prefix = [0]
+        for i in range(width + 2 * radius):
+            prefix.append(prefix[-1] + row[(i - radius) % width])
+        prefixes.append(prefix)
+    for y in range(height):
+        for x in range(width):
+            total = 0
+            for dy in range(-radius, radius + 1):
+                half = radius - abs(dy)
+                prefix = prefixes[(y + dy) % height]
+                total += prefix[x + radius + half + 1] - prefix[x + radius - half]
+            sums.set(y * width + x, total)
+    return sums
+
+
+def diamond_max(layer, radius):
+    """
+    Takes the largest value of a layer over the Manhattan diamond of the given radius
+    around every cell, wrapping around the map edges. The diamond of radius r is the
+    diamond of radius r - 1 grown by one cell in every cardinal direction, so this
+    takes radius passes over the map.
+    :param layer: The layer to read
+    :param radius: The largest distance from the centre cell to include
+    :return: A new layer holding the largest value around every cell
+    """
+    width, height = layer.width, layer.height
+    maxima = Layer(width, height, typecode=layer.typecode)
+    if layer.is_numpy:
+        grid = layer.as_grid()
+        for _ in range(radius):
+            grid = numpy.maximum.reduce([grid, numpy.roll(grid, 1, axis=0), numpy.roll(grid, -1, axis=0),
+                                         numpy.roll(grid, 1, axis=1), numpy.roll(grid, -1, axis=1)])
+        maxima.data[:] = grid.reshape(-1)
+        return maxima
+
+    grid = layer.as_grid()
+    for _ in range(radius):
+        grid = [[max(grid[y][x], grid[y][(x - 1) % width], grid[y][(x + 1) % width],
+                     grid[(y - 1) % height][x], grid[(y + 1) % height][x]) for x in range(width)]
+                for y in range(height)]
+    for y, row in enumerate(grid):
+        for x, value in enumerate(row):
+            maxima.set(y * width + x, value)
+    return maxima
+
+
+class HaliteNeighborhood:
+    """
+    Halite within a Manhattan radius of every cell of the map: its sum, mean and maximum,
+    each a layer computed for the whole map on first use, e.g.
+
+        mean_halite = game_map.get_halite_neighborhood(3).mean[ship.position]
+
+    Obtain it through GameMap.get_halite_neighborhood, which caches one per radius for the turn.
+    """
+    def __init__(self, game_map, radius):
+        self.game_map = game_map
+        self.radius = radius
+        self._sum = None
+        self._mean = None
+        self._max = None
+
+    @property
+    def sum(self):
+        if self._sum is None:
+            self._sum = diamond_sum(self.game_map.halite, self.radius)
+        return self._sum
+
+    @property
+    def mean(self):
+        if self._mean is None:
+            size = diamond_size(self.radius)
+            self._mean = Layer(self.game_map.width, self.game_map.height, typecode='d')
+            if self._mean.is_numpy:
+                self._mean.data[:] = self.sum.data / size
+            else:
+                for index, total in enumerate(self.sum.data):
+                    self._mean.set(index, total / size)
+        return self._mean
+
+    @property
+    def max(self):
+        if self._max is None:
+            self._max = diamond_max(self.game_map.halite, self.radius)
+        return self._max
@@ -1,79 +1,171 @@
+import atexit
 import json
 import logging
 import sys
+import time
 
-from .common import read_input
+from .common import arrival_time, read_input, read_ints
 from . import constants
+from .deadline import DEFAULT_BUDGET, DeadlineGuard
 from .game_map import GameMap, Player
+from .occupancy import Occupancy
+from .timing import TurnTimer
 
 
 class Game:
     """
     The game object holds all metadata pertinent to the game and all its contents
     """
-    def __init__(self):
+    def __init__(self, connection=None):
         """
         Initiates a game object collecting all start-state instances for the contained items for pre-game.
-        Also sets up basic logging.
+        Also sets up basic logging, unless a connection is given.
+        :param connection: An engine in the same process to play against instead of stdin/stdout, i.e. an object
+            with readline(), read_ints(count), send(commands) and arrival() methods (see arena.inprocess). Logging
+            is then left for the caller to configure.
         """
+        if connection is None:
+            self._read_line, self._read_ints, self._send = read_input, read_ints, send_commands
+            self._arrival = arrival_time
+        else:
+            self._read_line, self._read_ints, self._send = connection.readline, connection.read_ints, connection.send
+            self._arrival = connection.arrival
         self.turn_number = 0
+        # time.perf_counter() value at which the last frame arrived, which starts the turn's time budget
+        self.turn_start = time.perf_counter()
+        # Seconds spent parsing the last frame, from its arrival
+        self.parse_time = 0.0
+        # The DeadlineGuard run_strategy uses, once guard_deadline is called
+        self.deadline = None
 
         # Grab constants JSON
-        raw_constants = read_input()
+        raw_constants = self._read_line()
         constants.load_constants(json.loads(raw_constants))
 
-        num_players, self.my_id = map(int, read_input().split())
+        num_players, self.my_id = map(int, self._read_line().split())
 
-        logging.basicConfig(
-            filename="bot-{}.log".format(self.my_id),
-            filemode="w",
-            level=logging.DEBUG,
-        )
+        if connection is None:
+            logging.basicConfig(
+                filename="bot-{}.log".format(self.my_id),
+                filemode="w",
+                level=logging.DEBUG,
+            )
 
         self.players = {}
         for player in range(num_players):
-            self.players[player] = Player._generate()
+            self.players[player] = Player._generate(self._read_line)
         self.me = self.players[self.my_id]
-        self.game_map = GameMap._generate()
+        self.game_map = GameMap._generate(self._read_line)
+        for player in self.players.values():
+            self.game_map[player.shipyard.position].structure = player.shipyard
+        # Every player's ships and structures, rebuilt by update_frame
+        self.occupancy = Occupancy(self.game_map, self.players.values())
+
+        # Times every turn; its budget and warn_fraction may be adjusted
+        self.timing = TurnTimer("{}x{}".format(self.game_map.width, self.game_map.height))
+        self._timing_logged = False
+        if connection is None:
+            # For games ending early; the engine may kill the bot rather than let it exit after the last turn
+            atexit.register(self._log_timing_summary)
 
     def ready(self, name):
         """
         Indicate that your bot is ready to play.
         :param name: The name of your bot
         """
-        send_commands([name])
+        self._send([name])
 
     def update_frame(self):
         """
         Updates the game object's state.
         :returns: nothing.
         """
-        self.turn_number = int(read_input())
-        logging.info("=============== TURN {:03} ================".format(self.turn_number))
-
+        read_ints = self._read_ints
+        self.turn_number = read_ints(1)[0]
+        # The turn number blocks until the engine sends the frame, while the other bots play, and its
+        # reading may convert the whole frame: the turn and its parsing are timed from the frame's arrival
+        start = self.turn_start = self._arrival()
+        self.timing.start_frame(start)
         for _ in range(len(self.players)):
-            player, num_ships, num_dropoffs, halite = map(int, read_input().split())
-            self.players[player]._update(num_ships, num_dropoffs, halite)
+            player, num_ships, num_dropoffs, halite = read_ints(4)
+            self.players[player]._update(num_ships, num_dropoffs, halite,
+                                         read_ints(4 * num_ships + 3 * num_dropoffs))
+        self.game_map._update(read_ints(3 * read_ints(1)[0]))
 
-        self.game_map._update()
+        logging.info("=============== TURN {:03} ================".format(self.turn_number))
 
         # Mark cells with ships as unsafe for navigation
         for player in self.players.values():
             for ship in player.get_ships():
                 self.game_map[ship.position].mark_unsafe(ship)
 
-            self.game_map[player.shipyard.position].structure = player.shipyard
+            # Shipyards were placed at start-up, only new dropoffs need placing
             for dropoff in player.get_dropoffs():
-                self.game_map[dropoff.position].structure = dropoff
+                cell = self.game_map[dropoff.position]
+                if cell.structure is not dropoff:
+                    cell.structure = dropoff
+        self.occupancy = Occupancy(self.game_map, self.players.values())
+
+        self.parse_time = time.perf_counter() - start
+        logging.debug("Frame parsed in {:.2f} ms".format(self.parse_time * 1000))
+        self.timing.start_strategy()
 
-    @staticmethod
-    def end_turn(commands):
+    def guard_deadline(self, budget=DEFAULT_BUDGET):
+        """
+        Opts in to the deadline guard: from then on, run_strategy sends a safe set of commands
+        instead of the strategy's if the strategy is still running budget seconds into the turn.
+        :param budget: Seconds from the arrival of the turn's frame
+        :return: The DeadlineGuard, whose fallback_turns lists the turns that fell back
+        """
+        self.deadline = DeadlineGuard(self, budget)
+        return self.deadline
+
+    def run_strategy(self, strategy):
+        """
+        Runs the turn's strategy, under the deadline guard if guard_deadline was called, e.g.
+            game.end_turn(game.run_strategy(turn))
+        :param strategy: Function of the game returning the turn's commands
+        :return: The commands to send
+        """
+        if self.deadline is None:
+            return strategy(self)
+        return self.deadline.run(strategy)
+
+    def phase(self, name):
+        """
+        Times a part of your strategy, for the timing summary, e.g.
+            with game.phase("targets"):
+                ...
+        :param name: The name of the phase
+        :return: A context manager timing its block
+        """
+        return self.timing.phase(name)
+
+    def end_turn(self, commands):
         """
         Method to send all commands to the game engine, effectively ending your turn.
         :param commands: Array of commands to send to engine
         :return: nothing.
         """
-        send_commands(commands)
+        start = time.perf_counter()
+        self._send(commands)
+        self.timing.record(self.turn_number, len(self.me.get_ships()), self.parse_time,
+                           start, time.perf_counter() - start)
+        if self.turn_number >= constants.MAX_TURNS:
+            self._log_timing_summary()
+
+    def _log_timing_summary(self):
+        """
+        Logs the turn timing summary, once, when the game is over.
+        """
+        if self._timing_logged:
+            return
+        self._timing_logged = True
+        for line in self.timing.summary():
+            logging.info(line)
+        if self.deadline is not None:
+            logging.info("  fell back to the safe commands on {} turns: {}".format(
+                len(self.deadline.fallback_turns), self.deadline.fallback_turns))
 
 
 def send_commands(commands):
@@ -0,0 +1,136 @@
+from .layers import Layer
+
+"""Side in cells of the square buckets of a SpatialIndex."""
+BUCKET_SIZE = 8
+
+
+class SpatialIndex:
+    """
+    Entities bucketed by the BUCKET_SIZE x BUCKET_SIZE square of the map their position
+    falls in, so that finding those within a radius of a position only looks at the buckets
+    that radius overlaps, wrapping around the map edges.
+    """
+    def __init__(self, game_map, bucket_size=BUCKET_SIZE):
+        self.game_map = game_map
+        self.bucket_size = bucket_size
+        self._buckets = {}
+        self._count = 0
+
+    def add(self, entity):
+        """
+        :param entity: An entity with a normalized position
+        :return: nothing.
+        """
+        key = (entity.position.x // self.bucket_size, entity.position.y // self.bucket_size)
+        self._buckets.setdefault(key, []).append(entity)
+        self._count += 1
+
+    def _columns(self, center, radius, size):
+        if 2 * radius + 1 >= size:
+            return set(range((size - 1) // self.bucket_size + 1))
+        return {((center + offset) % size) // self.bucket_size for offset in range(-radius, radius + 1)}
+
+    def within(self, position, radius):
+        """
+        :param position: The position to search around
+        :param radius: The largest distance from position to include
+        :return: A list of the entities within radius of position
+        """
+        game_map = self.game_map
+        position = game_map.normalize(position)
+        found = []
+        for bucket_x in self._columns(position.x, radius, game_map.width):
+            for bucket_y in self._columns(position.y, radius, game_map.height):
+                for entity in self._buckets.get((bucket_x, bucket_y), ()):
+                    if game_map.calculate_distance(position, entity.position) <= radius:
+                        found.append(entity)
+        return found
+
+    def __iter__(self):
+        for bucket in self._buckets.values():
+            yield from bucket
+
+    def __len__(self):
+        return self._count
+
+
+class Occupancy:
+    """
+    Where every player's ships and structures (shipyard and dropoffs) are this turn: a
+    SpatialIndex of each player's ships, each player's structures, and 0/1 layers of the
+    cells each player occupies, built on first use. Queries take an optional player id to
+    leave out, so that game.my_id gives the enemies', e.g.
+
+        threats = game.occupancy.ships_within(ship.position, 2, exclude=game.my_id)
+
+    Obtain it as Game.occupancy, which update_frame rebuilds every turn.
+    """
+    def __init__(self, game_map, players):
+        self.game_map = game_map
+        self._ships = {}
+        self._structures = {}
+        for player in players:
+            index = self._ships[player.id] = SpatialIndex(game_map)
+            for ship in player.get_ships():
+                index.add(ship)
+            self._structures[player.id] = [player.shipyard] + player.get_dropoffs()
+        self._ship_layers = {}
+        self._structure_layers = {}
+
+    def _players(self, exclude):
+        return [player_id for player_id in self._ships if player_id != exclude]
+
+    def player_ids(self, exclude=None):
+        """
+        :param exclude: A player id to leave out
+        :return: A list of the ids of every other player
+        """
+        return self._players(exclude)
+
+    def ships(self, exclude=None):
+        """
+        :param exclude: A player id whose ships to leave out
+        :return: A list of the ships of every other player
+        """
+        return [ship for player_id in self._players(exclude) for ship in self._ships[player_id]]
+
+    def ships_within(self, position, radius, exclude=None):
+        """
+        :param position: The position to search around
+        :param radius: The largest distance from position to include
+        :param exclude: A player id whose ships to leave out
+        :return: A list of the ships of every other player within radius of position
+        """
+        return [ship for player_id in self._players(exclude)
+                for ship in self._ships[player_id].within(position, radius)]
+
+    def structures(self, exclude=None):
+        """
+        :param exclude: A player id whose structures to leave out
+        :return: A list of the shipyards and dropoffs of every other player
+        """
+        return [structure for player_id in self._players(exclude) for structure in self._structures[player_id]]
+
+    def ship_layer(self, player_id):
+        """
+        :param player_id: A player id
+        :return: A layer holding 1 on the cells that player's ships are on, 0 elsewhere
+        """
+        if player_id not in self._ship_layers:
+            self._ship_layers[player_id] = self._layer(self._ships[player_id])
+        return self._ship_layers[player_id]
+
+    def structure_layer(self, player_id):
+        """
+        :param player_id: A player id
+        :return: A layer holding 1 on the cells of that player's shipyard and dropoffs, 0 elsewhere
+        """
+        if player_id not in self._structure_layers:
+            self._structure_layers[player_id] = self._layer(self._structures[player_id])
+        return self._structure_layers[player_id]
+
+    def _layer(self, entities):
+        layer = Layer(self.game_map.width, self.game_map.height)
+        for entity in entities:
+            layer[entity.position] = 1
+        return layer
@@ -0,0 +1,102 @@
+import logging
+import time
+
+"""Share of the turn budget planning may run until, counted from the arrival of the turn's frame."""
+DEFAULT_SHARE = 0.7
+
+"""Seconds kept free before the guard's deadline, when the deadline guard is on."""
+GUARD_MARGIN = 0.1
+
+
+class AnytimePlanner:
+    """
+    Spends the time left in a turn improving a plan. The strategy supplies a fast initial
+    plan and a generator of improvements; improve() keeps drawing improved plans until the
+    turn's planning deadline, then returns the best plan so far. A quiet turn thus searches
+    deeper, while a busy one settles for what it has, e.g.
+
+        planner = AnytimePlanner(game)
+        cost = lambda ship_id, target: game_map.calculate_distance(ships[ship_id].position, target)
+        targets = planner.improve(nearest_targets, lambda plan: swap_improvements(plan, cost))
+
+    The generator should yield often: the deadline is only checked between plans, and no
+    new plan is drawn when the time left is shorter than the slowest step so far.
+    """
+    def __init__(self, game, share=DEFAULT_SHARE):
+        self.game = game
+        self.share = share
+        # Statistics of the last improve(): plans drawn, and seconds spent
+        self.iterations = 0
+        self.elapsed = 0.0
+
+    @property
+    def deadline(self):
+        """
+        :return: The time.perf_counter() value by which planning must stop this turn, counted like the
+            deadline guard's budget from the arrival of the frame (Game.turn_start)
+        """
+        budget = self.share * self.game.timing.budget
+        if self.game.deadline is not None:
+            budget = min(budget, self.game.deadline.budget - GUARD_MARGIN)
+        return self.game.turn_start + budget
+
+    def improve(self, initial, improvements, score=None, deadline=None):
+        """
+        :param initial: The initial plan, returned if there is no time to improve it
+        :param improvements: Function of the initial plan returning an iterator of improved plans
+        :param score: Function rating a plan, higher is better; without it, the latest plan is taken as the best
+        :param deadline: time.perf_counter() value to stop at, instead of the turn's planning deadline
+        :return: The best plan found in time
+        """
+        start = time.perf_counter()
+        deadline = self.deadline if deadline is None else deadline
+        best, best_score = initial, score(initial) if score is not None else None
+        self.iterations = 0
+        slowest = 0.0
+        last = start
+
+        candidates = iter(improvements(initial))
+        while last + slowest < deadline:
+            try:
+                plan = next(candidates)
+            except StopIteration:
+                break
+            self.iterations += 1
+            if score is None:
+                best = plan
+            else:
+                plan_score = score(plan)
+                if plan_score > best_score:
+                    best, best_score = plan, plan_score
+            now = time.perf_counter()
+            slowest = max(slowest, now - last)
+            last = now
+
+        self.elapsed = time.perf_counter() - start
+        logging.debug("Planned {} improvements in {:.1f} ms".format(self.iterations, self.elapsed * 1000))
+        return best
+
+
+def swap_improvements(assignment, cost):
+    """
+    Improves an assignment (e.g. of ships to targets) by exchanging the targets of two keys
+    whenever that lowers the total cost, yielding each improved assignment, and the current
+    one after every key tried so that a planner gets to check its deadline.
+    It stops when no exchange helps any more.
+    :param assignment: A dict of key -> target
+    :param cost: Function of a key and a target returning the cost of that pairing
+    :return: A generator of improved copies of the assignment
+    """
+    assignment = dict(assignment)
+    keys = list(assignment)
+    improved = True
+    while improved:
+        improved = False
+        for i, first in enumerate(keys):
+            for second in keys[i + 1:]:
+                a, b = assignment[first], assignment[second]
+                if cost(first, b) + cost(second, a) < cost(first, a) + cost(second, b):
+                    assignment[first], assignment[second] = b, a
+                    improved = True
+                    yield dict(assignment)
+            yield dict(assignment)
@@ -62,9 +62,33 @@ class Direction:
 
 
 class Position:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
+    """
+    An immutable, hashable pair of coordinates.
+
+    Once a map size has been registered with intern_positions, positions within
+    the map bounds are shared instances taken from a preallocated table. For those
+    normalize, directional_offset and get_surrounding_cardinals allocate nothing.
+    """
+    __slots__ = ('x', 'y', '_neighbors')
+
+    def __new__(cls, x, y):
+        if 0 <= x < _table_width and 0 <= y < _table_height:
+            return _table[y * _table_width + x]
+        return cls._create(x, y)
+
+    @classmethod
+    def _create(cls, x, y):
+        """
+        Allocates a new position, bypassing the intern table.
+        :param x: The x coordinate
+        :param y: The y coordinate
+        :return: A new position object
+        """
+        position = object.__new__(cls)
+        object.__setattr__(position, 'x', x)
+        object.__setattr__(position, 'y', y)
+        object.__setattr__(position, '_neighbors', None)
+        return position
 
     def directional_offset(self, direction):
         """
@@ -72,12 +96,17 @@ class Position:
         :param direction: the direction cardinal tuple
         :return: a new position moved in that direction
         """
-        return self + Position(*direction)
+        index = _DIRECTION_INDEX.get(direction)
+        if index is not None and self._neighbors is not None:
+            return self._neighbors[index]
+        return Position(self.x + direction[0], self.y + direction[1])
 
     def get_surrounding_cardinals(self):
         """
         :return: Returns a list of all positions around this specific position in each cardinal direction
         """
+        if self._neighbors is not None:
+            return list(self._neighbors[:4])
         return [self.directional_offset(current_direction) for current_direction in Direction.get_all_cardinals()]
 
     def __add__(self, other):
@@ -86,26 +115,63 @@ class Position:
     def __sub__(self, other):
         return Position(self.x - other.x, self.y - other.y)
 
-    def __iadd__(self, other):
-        self.x += other.x
-        self.y += other.y
-        return self
-
-    def __isub__(self, other):
-        self.x -= other.x
-        self.y -= other.y
-        return self
-
     def __abs__(self):
         return Position(abs(self.x), abs(self.y))
 
+    def __setattr__(self, name, value):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
     def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Position):
+            return NotImplemented
         return self.x == other.x and self.y == other.y
 
-    def __ne__(self, other):
-        return not self.__eq__(other)
+    def __hash__(self):
+        return hash((self.x, self.y))
+
+    def __reduce__(self):
+        return Position, (self.x, self.y)
 
     def __repr__(self):
         return "{}({}, {})".format(self.__class__.__name__,
                                    self.x,
                                    self.y)
+
+
+# Index of each direction within a position's neighbor table
+_DIRECTION_INDEX = {Direction.North: 0, Direction.South: 1, Direction.East: 2, Direction.West: 3,
+                    Direction.Still: 4}
+
+# The intern table: one shared position per cell of the registered map size
+_table = ()
+_table_width = 0
+_table_height = 0
+
+
+def intern_positions(width, height):
+    """
+    Preallocates one shared position for every cell of a width x height map, along
+    with its cardinal neighbors. Positions within these bounds are returned from the
+    table from then on. Positions are not normalized by this: a neighbor across the
+    map edge keeps its raw (out of bounds) coordinates, as before.
+    :param width: The map width
+    :param height: The map height
+    :return: nothing.
+    """
+    global _table, _table_width, _table_height
+    if (width, height) == (_table_width, _table_height):
+        return
+    table = [Position._create(x, y) for y in range(height) for x in range(width)]
+
+    def lookup(x, y):
+        if 0 <= x < width and 0 <= y < height:
+            return table[y * width + x]
+        return Position._create(x, y)
+
+    for position in table:
+        x, y = position.x, position.y
+        object.__setattr__(position, '_neighbors', tuple(
+            [lookup(x + dx, y + dy) for dx, dy in Direction.get_all_cardinals()] + [position]))
+    _table, _table_width, _table_height = tuple(table), width, height
@@ -0,0 +1,113 @@
+from . import constants
+from .navigation import PathTree
+
+"""Halite a turn is worth against the halite spent moving, when choosing the way home."""
+STEP_COST = 10
+
+"""Turns to spare on the way home, against being held up by other ships."""
+SAFETY_MARGIN = 4
+
+"""Ships a depot takes in on one turn: ships come from four sides, but hold each other up around it."""
+DEPOT_INTAKE = 2
+
+
+class RecallScheduler:
+    """
+    When to call every ship of a player home at the end of the game, so that each reaches a
+    depot in the last turns with as many turns of mining behind it as possible.
+
+    Once the end is near enough to matter, each turn builds one PathTree per depot, with a
+    step cost of STEP_COST so that the way home is quick as well as cheap, and reads every
+    ship's travel time off them: the moves to its best depot, plus a turn to mine first if it
+    cannot pay to leave its cell. A depot takes in at most DEPOT_INTAKE ships a turn, so the
+    ships bound for it queue for the last turns: the furthest gets the last turn, and every
+    DEPOT_INTAKE ships nearer go a turn earlier. A ship is recalled once its arrival turn,
+    less its travel time and SAFETY_MARGIN, comes.
+
+    Arrivals share the depot's turns on purpose, colliding on it, as the cargo of ships that
+    collide on a depot goes to its owner; is_final tells from which turn that starts, the
+    earliest arrival scheduled at any depot.
+    """
+    def __init__(self, game_map, player, margin=SAFETY_MARGIN):
+        """
+        :param game_map: The game map
+        :param player: The player whose ships to recall
+        :param margin: Turns to spare on the way home
+        """
+        self.game_map = game_map
+        self.player = player
+        self.margin = margin
+        # ship id -> (turn to recall the ship, position of its depot)
+        self._recalls = {}
+        # The earliest turn a recalled ship is scheduled to arrive at a depot
+        self._final_turn = constants.MAX_TURNS + 1
+        # depot position -> PathTree of the turn
+        self._trees = {}
+
+    def update(self, turn_number):
+        """
+        Schedules the whole fleet for this turn.
+        :param turn_number: The current turn
+        :return: nothing.
+        """
+        game_map = self.game_map
+        ships = self.player.get_ships()
+        self._recalls = {}
+        self._trees = {}
+        self._final_turn = constants.MAX_TURNS + 1
+        # Nothing to do while even the furthest ship in the longest queue has time to spare
+        horizon = game_map.width // 2 + game_map.height // 2 + len(ships) // DEPOT_INTAKE + self.margin + 1
+        if not ships or constants.MAX_TURNS - turn_number > horizon:
+            return
+
+        depots = [self.player.shipyard] + self.player.get_dropoffs()
+        for depot in depots:
+            self._trees[depot.position] = PathTree(game_map, [depot.position], STEP_COST)
+        queues = {}
+        for ship in ships:
+            depot, travel = min(((depot, tree.steps_from(ship.position), tree.cost_from(ship.position))
+                                 for depot, tree in self._trees.items()), key=lambda entry: entry[1:])[:2]
+            if ship.halite_amount < game_map[ship.position].halite_amount // constants.MOVE_COST_RATIO:
+                travel += 1
+            queues.setdefault(depot, []).append((travel, ship.id))
+
+        for depot, queue in queues.items():
+            queue.sort(reverse=True)
+            # The nearest ships arrive first, DEPOT_INTAKE a turn back from the last turn
+            self._final_turn = min(self._final_turn, constants.MAX_TURNS - (len(queue) - 1) // DEPOT_INTAKE)
+            for place, (travel, ship_id) in enumerate(queue):
+                # The ship ends a move on the depot on the turn it arrives, having set out travel - 1 turns before
+                arrival = constants.MAX_TURNS - place // DEPOT_INTAKE
+                recall = arrival - travel + 1 - self.margin
+                self._recalls[ship_id] = (recall, depot)
+
+    def is_recalled(self, ship_id, turn_number):
+        """
+        :param ship_id: The id of a ship of the player
+        :param turn_number: The current turn
+        :return: Whether the ship should head home for good
+        """
+        recall = self._recalls.get(ship_id)
+        return recall is not None and turn_number >= recall[0]
+
+    def depot(self, ship_id):
+        """
+        :param ship_id: The id of a ship of the player
+        :return: The position of the depot the ship is recalled to, or None before the end is near
+        """
+        recall = self._recalls.get(ship_id)
+        return recall[1] if recall is not None else None
+
+    def next_position(self, ship):
+        """
+        :param ship: A recalled ship of the player
+        :return: The position after the first move of the ship's way home
+        """
+        return self._trees[self.depot(ship.id)].next_position(ship.position)
+
+    def is_final(self, turn_number):
+        """
+        :param turn_number: The current turn
+        :return: Whether the recalled ships are arriving, and may collide on the depots
+        """
+        return turn_number >= self._final_turn
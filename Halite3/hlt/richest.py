@@ -0,0 +1,102 @@
+from .positionals import Position
+
+
+class RichestCells:
+    """
+    Every cell of the map ranked by halite, richest first; ties are ranked by x, then y.
+    The ranking is built once and then kept current one changed cell at a time, so reading
+    the top cells never sorts the map.
+
+    Cells are kept in buckets by halite amount, with a sorted list of the amounts that have
+    a bucket. Moving a changed cell between buckets takes constant time, plus a bisection
+    of that list when the cell's new amount is not yet held by another cell or its old one
+    is left empty; there are far fewer distinct amounts than cells. Reading walks the
+    buckets richest first, ordering the cells of each by x then y.
+
+    Obtain it as GameMap.richest, which GameMap._update keeps current.
+    """
+    def __init__(self, game_map):
+        self.game_map = game_map
+        self._halite = game_map.halite.data.tolist()
+        # halite amount -> set of the cell indices holding it, and the amounts by which cells are ranked
+        self._buckets = {}
+        for index, halite in enumerate(self._halite):
+            self._buckets.setdefault(halite, set()).add(index)
+        self._amounts = sorted(self._buckets, reverse=True)
+
+    def _entries(self):
+        # Every (cell index, halite), in ranking order
+        width, height = self.game_map.width, self.game_map.height
+        for halite in self._amounts:
+            for index in sorted(self._buckets[halite], key=lambda index: (index % width) * height + index // width):
+                yield index, halite
+
+    def _entry(self, index, halite):
+        width = self.game_map.width
+        return Position(index % width, index // width), halite
+
+    def update(self, positions):
+        """
+        Re-ranks cells whose halite changed.
+        :param positions: The positions whose halite changed
+        :return: nothing.
+        """
+        halite = self.game_map.halite
+        for position in positions:
+            index = halite.index(position)
+            new, old = halite.get(index), self._halite[index]
+            if new == old:
+                continue
+            bucket = self._buckets[old]
+            bucket.discard(index)
+            if not bucket:
+                del self._buckets[old]
+                del self._amounts[self._find(old)]
+            if new not in self._buckets:
+                self._buckets[new] = set()
+                self._amounts.insert(self._find(new), new)
+            self._buckets[new].add(index)
+            self._halite[index] = new
+
+    def _find(self, amount):
+        # Where amount is, or belongs, in the amounts sorted richest first
+        low, high = 0, len(self._amounts)
+        while low < high:
+            middle = (low + high) // 2
+            if self._amounts[middle] > amount:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def top(self, count=None):
+        """
+        :param count: How many cells to return; all of them if None
+        :return: A list of (Position, halite) of the richest cells, richest first
+        """
+        found = []
+        if count == 0:
+            return found
+        for index, halite in self._entries():
+            found.append(self._entry(index, halite))
+            if len(found) == count:
+                break
+        return found
+
+    def top_within(self, position, distance, count=None):
+        """
+        :param position: The position to search around
+        :param distance: The largest distance from position to include
+        :param count: How many cells to return; all of them if None
+        :return: A list of (Position, halite) of the richest cells within distance of position, richest first
+        """
+        found = []
+        if count == 0:
+            return found
+        for index, halite in self._entries():
+            entry = self._entry(index, halite)
+            if self.game_map.calculate_distance(position, entry[0]) <= distance:
+                found.append(entry)
+                if len(found) == count:
+                    break
+        return found
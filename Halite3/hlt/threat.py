@@ -0,0 +1,95 @@
+from . import constants
+from .layers import Layer
+from .positionals import Position
+
+"""Steps from an enemy ship over which its threat fades out."""
+DEFAULT_RADIUS = 3
+
+"""Share of the threat kept with every step away from an enemy ship."""
+DEFAULT_DECAY = 0.5
+
+"""Share of its threat a full ship sheds, as it has more to lose in a collision than an empty one."""
+CARGO_RELIEF = 0.5
+
+"""Distance to their nearest depot within which enemy ships count HOME_FACTOR times, as traffic is dense there."""
+HOME_RANGE = 3
+HOME_FACTOR = 1.5
+
+
+class ThreatField:
+    """
+    How dangerous every cell of the map is this turn for a player's ships, from the enemy
+    ships around. Each enemy ship weighs 1, less CARGO_RELIEF of its share of a full cargo,
+    times HOME_FACTOR near its own depots; its weight is spread over the cells within radius
+    of it, kept by decay with every step, and the risk of a cell adds up every ship's share.
+
+    Besides the risk, the field marks the contested cells: those an enemy ship is on or can
+    move onto this turn, so that checking a move is a single lookup, e.g.
+
+        threat = ThreatField(game)
+        safe = [p for p in candidates if not threat.is_dangerous(p)]
+    """
+    def __init__(self, game, ships=None, radius=DEFAULT_RADIUS, decay=DEFAULT_DECAY):
+        """
+        :param game: The game, updated for this turn
+        :param ships: The enemy ships to account for; all the other players' ships if None
+        :param radius: The furthest distance from an enemy ship that carries risk
+        :param decay: Share of the risk kept with every step away from an enemy ship
+        """
+        game_map = game.game_map
+        self.game_map = game_map
+        self.risk = Layer(game_map.width, game_map.height, typecode='d')
+        self.contested = Layer(game_map.width, game_map.height)
+        self._contested_positions = set()
+        if ships is None:
+            ships = game.occupancy.ships(exclude=game.my_id)
+
+        offsets = [(dx, dy, decay ** (abs(dx) + abs(dy)))
+                   for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+                   if abs(dx) + abs(dy) <= radius]
+        width, height = game_map.width, game_map.height
+        risk = {}
+        for ship in ships:
+            weight = self.weight(game, ship)
+            x, y = ship.position.x, ship.position.y
+            for dx, dy, share in offsets:
+                index = ((y + dy) % height) * width + (x + dx) % width
+                risk[index] = risk.get(index, 0.0) + weight * share
+                if abs(dx) + abs(dy) <= 1:
+                    self.contested.set(index, 1)
+                    self._contested_positions.add(Position((x + dx) % width, (y + dy) % height))
+        for index, value in risk.items():
+            self.risk.set(index, value)
+
+    @staticmethod
+    def weight(game, ship):
+        """
+        :param game: The game, updated for this turn
+        :param ship: An enemy ship
+        :return: The risk that ship puts on its own cell
+        """
+        weight = 1 - CARGO_RELIEF * min(ship.halite_amount / constants.MAX_HALITE, 1)
+        depots = game.game_map.get_depot_field(game.players[ship.owner])
+        if depots.distance_at(ship.position) <= HOME_RANGE:
+            weight *= HOME_FACTOR
+        return weight
+
+    def __getitem__(self, position):
+        """
+        :param position: A position object
+        :return: The risk of that cell
+        """
+        return self.risk[position]
+
+    def is_dangerous(self, position):
+        """
+        :param position: A position object
+        :return: Whether an enemy ship is on that cell or can move onto it this turn
+        """
+        return self.contested[position] == 1
+
+    def contested_positions(self):
+        """
+        :return: A set of the positions an enemy ship is on or can move onto this turn
+        """
+        return set(self._contested_positions)
@@ -0,0 +1,124 @@
+import contextlib
+import logging
+import math
+import time
+
+"""Seconds the engine allows per turn."""
+TURN_BUDGET = 2.0
+
+"""Share of the budget past which a turn is logged as a warning."""
+WARN_FRACTION = 0.8
+
+"""Lower bounds of the ship count ranges the summary reports on."""
+SHIP_COUNT_BUCKETS = (0, 10, 25, 50, 100)
+
+
+def percentile(values, fraction):
+    """
+    :param values: A non-empty sorted list
+    :param fraction: The percentile, between 0 and 1
+    :return: The nearest-rank percentile of values
+    """
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class TurnTimer:
+    """
+    Times every turn of a game: parsing the frame (update_frame), the strategy (from
+    update_frame returning to end_turn) and sending the commands (end_turn), along with
+    any phase of the strategy timed through phase(name). Turns are timed from the arrival
+    of their frame, as the engine does, leaving out the wait for the other bots to play.
+    Turns taking more than warn_fraction of the budget are logged as warnings as they happen.
+    """
+    def __init__(self, map_size, budget=TURN_BUDGET, warn_fraction=WARN_FRACTION):
+        self.map_size = map_size
+        self.budget = budget
+        self.warn_fraction = warn_fraction
+        # One dict per turn: turn, ships, parse, strategy, serialize, total and phases
+        self.turns = []
+        self._phases = {}
+        self._frame_start = None
+        self._strategy_start = None
+
+    def start_frame(self, arrival=None):
+        """
+        Marks the arrival of the current turn's frame, from which the turn is timed.
+        :param arrival: time.perf_counter() value at which the frame arrived (default: now)
+        :return: nothing.
+        """
+        self._frame_start = time.perf_counter() if arrival is None else arrival
+
+    def start_strategy(self):
+        """
+        Marks the end of parsing and the start of the strategy for the current turn.
+        :return: nothing.
+        """
+        self._strategy_start = time.perf_counter()
+        self._phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Times a block of the strategy, adding up every block of the same name within a turn.
+        :param name: The name of the phase
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._phases[name] = self._phases.get(name, 0.0) + time.perf_counter() - start
+
+    def record(self, turn_number, ship_count, parse_time, serialize_start, serialize_time):
+        """
+        Records a finished turn.
+        :param turn_number: The turn
+        :param ship_count: How many ships the bot had this turn
+        :param parse_time: Seconds spent parsing the frame, from its arrival
+        :param serialize_start: time.perf_counter() value at which the strategy handed over its commands
+        :param serialize_time: Seconds spent sending the commands
+        :return: The turn's total time in seconds
+        """
+        strategy = serialize_start - self._strategy_start if self._strategy_start is not None else 0.0
+        if self._frame_start is not None:
+            total = serialize_start + serialize_time - self._frame_start
+        else:
+            total = parse_time + strategy + serialize_time
+        self.turns.append({"turn": turn_number, "ships": ship_count, "parse": parse_time, "strategy": strategy,
+                           "serialize": serialize_time, "total": total, "phases": self._phases})
+        self._frame_start = None
+        self._strategy_start = None
+        self._phases = {}
+        if total > self.warn_fraction * self.budget:
+            logging.warning("Turn {} took {:.0f} ms, {:.0%} of the {:.1f} s budget".format(
+                turn_number, total * 1000, total / self.budget, self.budget))
+        return total
+
+    def summary(self):
+        """
+        :return: Lines with the p50/p95/max times of the game, per part of the turn and per ship count range
+        """
+        if not self.turns:
+            return ["No turns timed on {}".format(self.map_size)]
+
+        def line(label, values):
+            values = sorted(values)
+            return "  {:<16} n={:<4} p50 {:7.1f} ms  p95 {:7.1f} ms  max {:7.1f} ms".format(
+                label, len(values), percentile(values, 0.5) * 1000, percentile(values, 0.95) * 1000,
+                values[-1] * 1000)
+
+        lines = ["Turn timing on {}, budget {:.1f} s:".format(self.map_size, self.budget)]
+        for part in ("total", "parse", "strategy", "serialize"):
+            lines.append(line(part, [turn[part] for turn in self.turns]))
+        for name in sorted({name for turn in self.turns for name in turn["phases"]}):
+            lines.append(line(name, [turn["phases"][name] for turn in self.turns if name in turn["phases"]]))
+
+        bounds = list(SHIP_COUNT_BUCKETS) + [float("inf")]
+        for low, high in zip(bounds, bounds[1:]):
+            totals = [turn["total"] for turn in self.turns if low <= turn["ships"] < high]
+            if totals:
+                label = "{}+ ships".format(low) if high == float("inf") else "{}-{} ships".format(low, high - 1)
+                lines.append(line(label, totals))
+
+        slow = sum(1 for turn in self.turns if turn["total"] > self.warn_fraction * self.budget)
+        lines.append("  {} of {} turns over {:.0%} of the budget".format(slow, len(self.turns), self.warn_fraction))
+        return lines
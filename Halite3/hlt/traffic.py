@@ -0,0 +1,135 @@
+"""Cells next to a depot kept as inbound lanes, when ships are arriving."""
+INBOUND_LANES = 2
+
+
+class DepotTraffic:
+    """
+    The traffic in and out of one depot over the next turns. Only one ship can end a turn
+    on the depot, so returning ships queue by their arrival turn (ETA) and each is given the
+    first free turn on the depot cell from its ETA on: its slot. The cells next to the depot
+    are split into inbound lanes, the INBOUND_LANES sides most returning ships come from, and
+    outbound lanes for the ships leaving it; each lane cell is claimed turn by turn, by the
+    arriving ships waiting on it the turn before their slot and the leaving ships the turn
+    after.
+
+    Turns count as in Game.turn_number: a claim on turn + 1 is about where ships end this
+    turn. A returning ship whose slot comes later than it could reach the depot heads for
+    its lane instead and waits there, and what is left free tells the spawn logic exactly
+    when the yard takes a new ship, e.g.
+
+        traffic = DepotTraffic(game_map, me.shipyard.position, game.turn_number)
+        traffic.schedule(returning_ships, leaving_ships)
+        if traffic.slot(ship.id) > game.turn_number + game_map.calculate_distance(ship.position, traffic.depot):
+            goal = traffic.lane(ship.id)
+        ...
+        if traffic.claim_spawn():
+            command_queue.append(me.shipyard.spawn())
+    """
+    def __init__(self, game_map, depot, turn_number):
+        """
+        :param game_map: The game map
+        :param depot: The position of the shipyard or dropoff
+        :param turn_number: The current turn
+        """
+        self.game_map = game_map
+        self.depot = game_map.normalize(depot)
+        self.turn = turn_number
+        lanes = [game_map.normalize(position) for position in self.depot.get_surrounding_cardinals()]
+        self.inbound = lanes[:INBOUND_LANES]
+        self.outbound = lanes[INBOUND_LANES:]
+        # Ship ids by (eta, ship id), turn -> ship id on the depot cell, and (lane cell, turn) -> ship id
+        self.arrivals = []
+        self.slots = {}
+        self.claims = {}
+        self._slot_of = {}
+        self._lane_of = {}
+
+    def _nearest_lane(self, position, lanes):
+        return min(lanes, key=lambda lane: self.game_map.calculate_distance(position, lane))
+
+    def schedule(self, arrivals, departures=()):
+        """
+        Queues the returning ships by ETA, gives each a slot on the depot and a lane to wait on,
+        and the leaving ships an outbound lane for the next turn.
+        :param arrivals: The ships heading to the depot, or (ship, eta) pairs where eta is the turn
+            the ship is planned to reach the depot, None for the turn its distance allows
+        :param departures: The ships on the depot, which leave it this turn
+        :return: nothing.
+        """
+        game_map = self.game_map
+        lanes = self.inbound + self.outbound
+        queue = []
+        for arrival in arrivals:
+            ship, eta = arrival if isinstance(arrival, tuple) else (arrival, None)
+            if eta is None:
+                eta = self.turn + game_map.calculate_distance(ship.position, self.depot)
+            queue.append((eta, ship.id, self._nearest_lane(ship.position, lanes)))
+        queue.sort(key=lambda entry: entry[:2])
+
+        # The sides most ships come from become the inbound lanes; ties keep the cardinal order
+        approaches = [entry[2] for entry in queue]
+        lanes.sort(key=lambda lane: -approaches.count(lane))
+        self.inbound, self.outbound = lanes[:INBOUND_LANES], lanes[INBOUND_LANES:]
+
+        for eta, ship_id, approach in queue:
+            slot = max(eta, self.turn + 1)
+            while slot in self.slots:
+                slot += 1
+            self.slots[slot] = ship_id
+            self.arrivals.append(ship_id)
+            self._slot_of[ship_id] = slot
+            # Wait the turn before the slot on the side the ship comes from, else on any free lane
+            for lane in [approach] + [lane for lane in lanes if lane != approach]:
+                if (lane, slot - 1) not in self.claims:
+                    self.claims[(lane, slot - 1)] = ship_id
+                    self._lane_of[ship_id] = lane
+                    break
+
+        for ship in departures:
+            lane = self._free_lane(self.outbound + self.inbound, self.turn + 1)
+            if lane is not None:
+                self.claims[(lane, self.turn + 1)] = ship.id
+                self._lane_of[ship.id] = lane
+
+    def _free_lane(self, lanes, turn, occupied=()):
+        for lane in lanes:
+            if (lane, turn) not in self.claims and lane not in occupied:
+                return lane
+        return None
+
+    def slot(self, ship_id):
+        """
+        :param ship_id: The id of a returning ship
+        :return: The turn that ship is slotted to end on the depot, or None if it is not returning
+        """
+        return self._slot_of.get(ship_id)
+
+    def lane(self, ship_id):
+        """
+        :param ship_id: The id of a returning or leaving ship
+        :return: The lane cell the ship was given, or None
+        """
+        return self._lane_of.get(ship_id)
+
+    def is_free(self, turn):
+        """
+        :param turn: A turn
+        :return: Whether no returning ship is slotted to end that turn on the depot
+        """
+        return turn not in self.slots
+
+    def claim_spawn(self, occupied=()):
+        """
+        Claims the yard for a ship spawned this turn, if it is free at the end of the turn and the
+        new ship has an outbound lane to leave by on the next one.
+        :param occupied: Lane cells the ships of the fleet end this turn on, which the new ship cannot leave by
+        :return: Whether the spawn was claimed
+        """
+        if not self.is_free(self.turn + 1):
+            return False
+        lane = self._free_lane(self.outbound + self.inbound, self.turn + 2, occupied)
+        if lane is None:
+            return False
+        self.slots[self.turn + 1] = None
+        self.claims[(lane, self.turn + 2)] = None
+        return True
@@ -0,0 +1,261 @@
+from .layers import numpy
+from .positionals import Direction
+
+"""Actions in the order of the utilities of every cell: the four cardinals, then staying still."""
+ACTIONS = Direction.get_all_cardinals() + [Direction.Still]
+
+"""Index of staying still among ACTIONS."""
+STILL = len(ACTIONS) - 1
+
+"""Turns (map generations) between two full sweeps when refreshing incrementally."""
+FULL_SWEEP_EVERY = 20
+
+"""Share of the map past which changed cells are refreshed by a full sweep instead."""
+FULL_SWEEP_SHARE = 0.25
+
+"""Distance from the changed cells beyond which an incremental refresh does not propagate."""
+DEFAULT_RADIUS = 6
+
+"""Change in a cell's utilities below which an incremental refresh stops propagating from it."""
+DEFAULT_TOLERANCE = 0.5
+
+
+class UtilityGrid:
+    """
+    Utility of every action (moving in a cardinal direction or staying still) from every
+    cell of the map, learnt by value iteration on the torus. One sweep updates every
+    utility at once from the previous sweep's values:
+
+        utility[cell, action] = (1 - alpha) * utility[cell, action]
+                                + alpha * (reward[target] * (1 - cost) + gamma * max(utility[target]))
+
+    where target is the cell the action leads to, the reward is its halite, and the cost
+    does not apply to staying still. Utilities are kept from one turn to the next, so each
+    turn's sweeps start from the previous turn's values.
+
+    As only the cells the engine reports change from one turn to the next, refresh() can
+    re-propagate from those cells only (see sweep_changed), with a full sweep every few
+    turns to bound the drift of the cells left alone.
+
+    With NumPy the utilities are a (height, width, 5) array updated with numpy.roll,
+    otherwise a list of 5 utilities per cell in row-major order.
+    """
+    def __init__(self, game_map, alpha, gamma, cost):
+        self.width = game_map.width
+        self.height = game_map.height
+        self.alpha = alpha
+        self.gamma = gamma
+        self.cost = cost
+        self._neighbors = game_map.neighbor_indices
+        if numpy is not None:
+            self.utilities = numpy.zeros((self.height, self.width, len(ACTIONS)))
+            self.rewards = numpy.zeros((self.height, self.width))
+            self._neighbor_array = numpy.array(self._neighbors, dtype=numpy.intp)
+        else:
+            self.utilities = [[0.0] * len(ACTIONS) for _ in range(self.width * self.height)]
+            self.rewards = [0.0] * (self.width * self.height)
+        self.update_rewards(game_map)
+
+    @property
+    def is_numpy(self):
+        return not isinstance(self.rewards, list)
+
+    def update_rewards(self, game_map, changed=None):
+        """
+        Takes the halite on the map as the reward of every cell, which is also the
+        starting utility of staying still there.
+        :param game_map: The game map, updated for this turn
+        :param changed: Positions whose halite changed, e.g. game_map.dirty_cells; only those are re-read if given
+        :return: nothing.
+        """
+        if changed is not None:
+            for index in self._indices(changed):
+                reward = float(game_map.halite.data[index])
+                if self.is_numpy:
+                    y, x = divmod(index, self.width)
+                    self.rewards[y, x] = self.utilities[y, x, STILL] = reward
+                else:
+                    self.rewards[index] = self.utilities[index][STILL] = reward
+        elif self.is_numpy:
+            self.rewards[:] = game_map.halite.as_grid()
+            self.utilities[:, :, STILL] = self.rewards
+        else:
+            self.rewards = [float(halite) for halite in game_map.halite.data]
+            for utilities, reward in zip(self.utilities, self.rewards):
+                utilities[STILL] = reward
+
+    def refresh(self, game_map, iterations, full_sweep_every=FULL_SWEEP_EVERY, radius=DEFAULT_RADIUS,
+                tolerance=DEFAULT_TOLERANCE):
+        """
+        Brings the utilities up to date with this turn's map: a full update_rewards and sweep
+        every full_sweep_every map generations or when many cells changed, otherwise an
+        update of the changed cells' rewards and sweep_changed from them.
+        :param game_map: The game map, updated for this turn
+        :param iterations: The most sweeps to run
+        :return: The number of cell updates made
+        """
+        changed = game_map.dirty_cells
+        if game_map.generation % full_sweep_every == 0 or \
+                len(changed) > FULL_SWEEP_SHARE * self.width * self.height:
+            self.update_rewards(game_map)
+            return self.sweep(iterations) * self.width * self.height
+        self.update_rewards(game_map, changed)
+        return self.sweep_changed(changed, iterations, radius, tolerance)
+
+    def sweep(self, iterations, tolerance=None):
+        """
+        Runs value iteration sweeps.
+        :param iterations: The most sweeps to run
+        :param tolerance: Stop early once no utility changes by more than this in a sweep
+        :return: The number of sweeps run
+        """
+        for iteration in range(1, iterations + 1):
+            change = self._sweep_numpy() if self.is_numpy else self._sweep()
+            if tolerance is not None and change <= tolerance:
+                return iteration
+        return iterations
+
+    def _sweep_numpy(self):
+        best = self.utilities.max(axis=2)
+        move = self.rewards * (1 - self.cost) + self.gamma * best
+        targets = numpy.stack([
+            numpy.roll(move, (-dy, -dx), axis=(0, 1)) for dx, dy in Direction.get_all_cardinals()
+        ] + [self.rewards + self.gamma * best], axis=2)
+        updated = (1 - self.alpha) * self.utilities + self.alpha * targets
+        change = numpy.abs(updated - self.utilities).max()
+        self.utilities = updated
+        return change
+
+    def _sweep(self):
+        alpha, keep = self.alpha, 1 - self.alpha
+        best = [max(utilities) for utilities in self.utilities]
+        move = [reward * (1 - self.cost) + self.gamma * value for reward, value in zip(self.rewards, best)]
+        change = 0.0
+        for index, (utilities, neighbors) in enumerate(zip(self.utilities, self._neighbors)):
+            targets = [move[neighbor] for neighbor in neighbors]
+            targets.append(self.rewards[index] + self.gamma * best[index])
+            for action, target in enumerate(targets):
+                updated = keep * utilities[action] + alpha * target
+                change = max(change, abs(updated - utilities[action]))
+                utilities[action] = updated
+        return change
+
+    def sweep_changed(self, changed, iterations, radius=DEFAULT_RADIUS, tolerance=DEFAULT_TOLERANCE):
+        """
+        Runs sweeps restricted to the cells affected by a change of reward at the changed
+        cells: the first sweep updates the cells that can move onto or stay on a changed
+        cell, and each following sweep the cells next to one whose utilities moved by more
+        than tolerance, never further than radius steps from a changed cell.
+        Cells left out keep last turn's utilities.
+        :param changed: Positions whose reward changed, e.g. game_map.dirty_cells
+        :param iterations: The most sweeps to run
+        :param radius: The furthest distance from a changed cell to update
+        :param tolerance: The smallest change in a cell's utilities that propagates to its neighbors
+        :return: The number of cell updates made
+        """
+        if self.is_numpy:
+            return self._sweep_changed_numpy(changed, iterations, radius, tolerance)
+        sources = set(self._indices(changed))
+        region = set(sources)
+        ring = sources
+        for _ in range(radius):
+            ring = {neighbor for index in ring for neighbor in self._neighbors[index]} - region
+            region |= ring
+
+        updates = 0
+        active = self._around(sources) & region
+        for _ in range(iterations):
+            if not active:
+                break
+            cells = sorted(active)
+            updates += len(cells)
+            active = self._around(self._sweep_cells(cells, tolerance)) & region
+        return updates
+
+    def _sweep_changed_numpy(self, changed, iterations, radius, tolerance):
+        # Same as the pure-Python version, with the cell sets kept as flat boolean masks
+        sources = numpy.zeros(self.width * self.height, dtype=bool)
+        sources[self._indices(changed)] = True
+        region = sources
+        for _ in range(radius):
+            region = self._around_numpy(region)
+
+        updates = 0
+        active = self._around_numpy(sources) & region
+        for _ in range(iterations):
+            cells = numpy.flatnonzero(active)
+            if not len(cells):
+                break
+            updates += len(cells)
+            moved = numpy.zeros(self.width * self.height, dtype=bool)
+            moved[self._sweep_cells_numpy(cells, tolerance)] = True
+            active = self._around_numpy(moved) & region
+        return updates
+
+    def _indices(self, positions):
+        return [(position.y % self.height) * self.width + position.x % self.width for position in positions]
+
+    def _around(self, cells):
+        # A cell's targets are itself and its neighbors, and being neighbors is symmetric
+        around = set(cells)
+        for index in cells:
+            around.update(self._neighbors[index])
+        return around
+
+    def _around_numpy(self, mask):
+        around = mask.copy()
+        for direction in range(STILL):
+            around |= mask[self._neighbor_array[:, direction]]
+        return around
+
+    def _sweep_cells_numpy(self, cells, tolerance):
+        utilities = self.utilities.reshape(-1, len(ACTIONS))
+        rewards = self.rewards.reshape(-1)
+        neighbors = self._neighbor_array[cells]
+        # max(axis=1) is slow over 5 actions; the element-wise maximum of the columns is not
+        best = utilities[:, 0]
+        for action in range(1, len(ACTIONS)):
+            best = numpy.maximum(best, utilities[:, action])
+        targets = numpy.empty((len(cells), len(ACTIONS)))
+        targets[:, :STILL] = rewards[neighbors] * (1 - self.cost) + self.gamma * best[neighbors]
+        targets[:, STILL] = rewards[cells] + self.gamma * best[cells]
+        old = utilities[cells]
+        updated = (1 - self.alpha) * old + self.alpha * targets
+        # utilities is a view, so this writes through to self.utilities
+        utilities[cells] = updated
+        return cells[(numpy.abs(updated - old) > tolerance).any(axis=1)]
+
+    def _sweep_cells(self, cells, tolerance):
+        alpha, keep = self.alpha, 1 - self.alpha
+        best = {index: max(self.utilities[index]) for index in self._around(cells)}
+        moved = []
+        for index in cells:
+            utilities = self.utilities[index]
+            targets = [self.rewards[neighbor] * (1 - self.cost) + self.gamma * best[neighbor]
+                       for neighbor in self._neighbors[index]]
+            targets.append(self.rewards[index] + self.gamma * best[index])
+            change = 0.0
+            for action, target in enumerate(targets):
+                updated = keep * utilities[action] + alpha * target
+                change = max(change, abs(updated - utilities[action]))
+                utilities[action] = updated
+            if change > tolerance:
+                moved.append(index)
+        return moved
+
+    def action_utilities(self, position):
+        """
+        :param position: A position object
+        :return: The utility of every action from that cell, in ACTIONS order
+        """
+        x, y = position.x % self.width, position.y % self.height
+        if self.is_numpy:
+            return self.utilities[y, x].tolist()
+        return list(self.utilities[y * self.width + x])
+
+    def ranked_actions(self, position):
+        """
+        :param position: A position object
+        :return: (Direction, utility) for every action from that cell, best first; ties keep ACTIONS order
+        """
+        return sorted(zip(ACTIONS, self.action_utilities(position)), key=lambda action: action[1], reverse=True)
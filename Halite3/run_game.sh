@@ -1,3 +1,10 @@
 #!/bin/sh
 
-halite --replay-directory replays/ -vvv --width 52 --height 52 "python3 MyBot.py" "python3 MyBot.py"
+# The bundled halite executable only runs on macOS; elsewhere use the Python engine in arena/
+if [ "$(uname)" = "Darwin" ]; then
+    HALITE="./halite"
+else
+    HALITE="python3 -m arena"
+fi
+
+$HALITE --replay-directory replays/ -vvv --width 52 --height 52 "python3 MyBot.py" "python3 MyBot.py"